@@ -2,9 +2,15 @@
 Basic example of using tr-ai-cing to trace LLM calls.
 """
 
+from functools import lru_cache
+
 from tracing import Tracer, trace_llm_call, Visualizer
 
 
+# The simulated call is deterministic, so repeated prompts can be served from
+# memory. Only cache a real LLM call like this when it is deterministic too
+# (e.g. temperature=0).
+@lru_cache(maxsize=1024)
 def simulate_llm_call(prompt: str, model: str = "gpt-4") -> str:
     """Simulate an LLM call (replace with actual LLM API call)."""
     return f"Response to: {prompt}"
@@ -67,8 +73,9 @@ def main():
         tracer=tracer
     )
     
-    # End the trace
+    # End the trace and close the log file
     tracer.end_trace()
+    tracer.close()
     print("Trace completed!")
     
     # Generate visualization
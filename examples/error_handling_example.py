@@ -68,6 +68,7 @@ def main():
             print(f"✗ Error: {e}")
     
     tracer.end_trace()
+    tracer.close()
     print("\nTrace completed!")
     
     # Generate visualization
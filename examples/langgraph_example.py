@@ -7,8 +7,15 @@ This example demonstrates a simple LangGraph agent that:
 3. Generates a final response
 
 The tr-ai-cing tracer captures all node executions and their relationships.
+The nodes are async, and the independent workflows run concurrently with
+asyncio.gather; each task keeps its own span stack, so the traced hierarchy
+stays correct while they interleave. Each workflow collects its progress
+lines and main() prints them once all workflows are done, so the console
+output of one workflow is not interleaved with another's.
 """
 
+import asyncio
+from functools import lru_cache
 from typing import Annotated, TypedDict, Literal
 from tracing import Tracer, Visualizer
 
@@ -21,6 +28,10 @@ class AgentState(TypedDict):
     final_response: str
 
 
+# The simulated call is deterministic, so repeated prompts can be served from
+# memory. Only cache a real LLM call like this when it is deterministic too
+# (e.g. temperature=0).
+@lru_cache(maxsize=1024)
 def simulate_llm_call(prompt: str, model: str = "gpt-4") -> str:
     """Simulate an LLM call (replace with actual LLM API in production)."""
     # In a real implementation, this would call OpenAI, Anthropic, etc.
@@ -34,15 +45,22 @@ def simulate_llm_call(prompt: str, model: str = "gpt-4") -> str:
         return f"I understand your message: {prompt}"
 
 
+async def simulate_llm_call_async(prompt: str, model: str = "gpt-4") -> str:
+    """Simulate an async LLM call (await an async client in production)."""
+    # Stand-in for network latency, during which other workflows make progress
+    await asyncio.sleep(0.01)
+    return simulate_llm_call(prompt, model)
+
+
 # Node functions for the graph
-def analyze_input(state: AgentState, tracer: Tracer) -> AgentState:
+async def analyze_input(state: AgentState, tracer: Tracer) -> AgentState:
     """Analyze the user input to determine the next action."""
     with tracer.span("analyze_input", span_type="agent_node"):
         user_message = state["messages"][-1]
         
         # Simulate LLM call to classify intent
         prompt = f"Classify the intent of this message: {user_message}"
-        classification = simulate_llm_call(prompt)
+        classification = await simulate_llm_call_async(prompt)
         
         tracer.log_llm_call(
             name="intent_classification",
@@ -59,7 +77,7 @@ def analyze_input(state: AgentState, tracer: Tracer) -> AgentState:
     return state
 
 
-def search_node(state: AgentState, tracer: Tracer) -> AgentState:
+async def search_node(state: AgentState, tracer: Tracer) -> AgentState:
     """Execute a search and return results."""
     with tracer.span("search_node", span_type="agent_node"):
         user_message = state["messages"][0]
@@ -82,14 +100,14 @@ def search_node(state: AgentState, tracer: Tracer) -> AgentState:
     return state
 
 
-def direct_response_node(state: AgentState, tracer: Tracer) -> AgentState:
+async def direct_response_node(state: AgentState, tracer: Tracer) -> AgentState:
     """Generate a direct response without search."""
     with tracer.span("direct_response_node", span_type="agent_node"):
         user_message = state["messages"][0]
         
         # Simulate direct LLM response
         prompt = f"Respond to: {user_message}"
-        response = simulate_llm_call(prompt)
+        response = await simulate_llm_call_async(prompt)
         
         tracer.log_llm_call(
             name="direct_response_generation",
@@ -105,14 +123,14 @@ def direct_response_node(state: AgentState, tracer: Tracer) -> AgentState:
     return state
 
 
-def generate_final_response(state: AgentState, tracer: Tracer) -> AgentState:
+async def generate_final_response(state: AgentState, tracer: Tracer) -> AgentState:
     """Generate the final response based on all previous steps."""
     with tracer.span("generate_final_response", span_type="agent_node"):
         conversation_history = "\n".join(state["messages"])
         
         # Simulate final response generation
         prompt = f"Generate final response based on:\n{conversation_history}"
-        final_response = simulate_llm_call(prompt)
+        final_response = await simulate_llm_call_async(prompt)
         
         tracer.log_llm_call(
             name="final_response_synthesis",
@@ -137,7 +155,7 @@ def route_after_analysis(state: AgentState) -> Literal["search", "direct_respons
         return "direct_response"
 
 
-def run_langgraph_workflow(user_input: str, tracer: Tracer):
+async def run_langgraph_workflow(user_input: str, tracer: Tracer):
     """
     Simulate a LangGraph workflow execution.
     
@@ -148,11 +166,17 @@ def run_langgraph_workflow(user_input: str, tracer: Tracer):
     - add_conditional_edges() for routing
     - compile() to create the runnable graph
     
-    This simplified version demonstrates the tracing pattern.
+    This simplified version demonstrates the tracing pattern. Each step
+    depends on the previous one, so the nodes of one workflow run in order;
+    independent workflows are run concurrently by main(), so progress is
+    collected into a report returned alongside the final state rather than
+    printed as it happens.
     """
-    print(f"\n{'='*60}")
-    print(f"Processing: {user_input}")
-    print(f"{'='*60}\n")
+    report = [
+        f"\n{'='*60}",
+        f"Processing: {user_input}",
+        f"{'='*60}\n",
+    ]
     
     # Initialize state
     state: AgentState = {
@@ -164,26 +188,26 @@ def run_langgraph_workflow(user_input: str, tracer: Tracer):
     # Execute graph nodes in sequence (in real LangGraph, this is handled by the graph)
     with tracer.span("langgraph_workflow", span_type="workflow"):
         # Step 1: Analyze input
-        state = analyze_input(state, tracer)
-        print(f"✓ Analysis complete: {state['next_action']}")
+        state = await analyze_input(state, tracer)
+        report.append(f"✓ Analysis complete: {state['next_action']}")
         
         # Step 2: Route based on analysis
         next_step = route_after_analysis(state)
-        print(f"✓ Routing to: {next_step}")
+        report.append(f"✓ Routing to: {next_step}")
         
         # Step 3: Execute appropriate action
         if next_step == "search":
-            state = search_node(state, tracer)
-            print(f"✓ Search complete")
+            state = await search_node(state, tracer)
+            report.append("✓ Search complete")
         else:
-            state = direct_response_node(state, tracer)
-            print(f"✓ Direct response generated")
+            state = await direct_response_node(state, tracer)
+            report.append("✓ Direct response generated")
         
         # Step 4: Generate final response
-        state = generate_final_response(state, tracer)
-        print(f"✓ Final response: {state['final_response']}\n")
+        state = await generate_final_response(state, tracer)
+        report.append(f"✓ Final response: {state['final_response']}\n")
     
-    return state
+    return state, report
 
 
 def main():
@@ -195,26 +219,27 @@ def main():
     trace_id = tracer.start_trace()
     print(f"Started trace: {trace_id}")
     
-    # Example 1: Question that should use search
-    run_langgraph_workflow(
-        "What's the weather like today?",
-        tracer
-    )
+    # The three workflows are independent, so run them concurrently: total
+    # latency is that of the slowest workflow rather than the sum of all three
+    async def run_all():
+        return await asyncio.gather(
+            # Example 1: Question that should use search
+            run_langgraph_workflow("What's the weather like today?", tracer),
+            # Example 2: Question that should get direct response
+            run_langgraph_workflow("What is the capital of France?", tracer),
+            # Example 3: General query
+            run_langgraph_workflow("Tell me about artificial intelligence", tracer),
+        )
     
-    # Example 2: Question that should get direct response
-    run_langgraph_workflow(
-        "What is the capital of France?",
-        tracer
-    )
+    results = asyncio.run(run_all())
     
-    # Example 3: General query
-    run_langgraph_workflow(
-        "Tell me about artificial intelligence",
-        tracer
-    )
+    # Print each workflow's progress in order, now that none are still running
+    for _, report in results:
+        print("\n".join(report))
     
-    # End trace
+    # End trace and close the log file
     tracer.end_trace()
+    tracer.close()
     print(f"\n{'='*60}")
     print("Trace completed!")
     print(f"{'='*60}\n")
@@ -6,7 +6,10 @@ This package provides tools for tracing and visualizing LLM application workflow
 
 __version__ = "0.1.0"
 
-from .tracer import Tracer, trace_llm_call
+from .cache import LLMCache
+from .executor import ContextPreservingThreadPoolExecutor
+from .semantic_cache import SemanticCache
+from .tracer import AsyncTracer, Tracer, get_default_tracer, trace_llm_call
 from .visualizer import Visualizer
 
-__all__ = ["Tracer", "trace_llm_call", "Visualizer"]
+__all__ = ["Tracer", "AsyncTracer", "trace_llm_call", "get_default_tracer", "Visualizer", "ContextPreservingThreadPoolExecutor", "LLMCache", "SemanticCache"]
@@ -0,0 +1,99 @@
+"""
+Cache module for skipping repeated identical LLM calls.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class LLMCache:
+    """
+    An in-memory, exact-match LRU cache of LLM responses.
+
+    Responses are keyed by a hash of the model, the prompt and any
+    generation parameters, so only byte-for-byte identical requests hit.
+    This is only safe for deterministic calls (e.g. temperature=0).
+    Use it through Tracer.cached_llm_call() to have hits and misses
+    recorded on the logged span.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of responses kept (default: 1024)
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: Optional[str], prompt: Any, **params: Any) -> str:
+        """
+        Build the cache key for a request.
+
+        Args:
+            model: Model name
+            prompt: Prompt or messages sent to the model
+            **params: Generation parameters that affect the response
+
+        Returns:
+            A hex SHA-256 digest identifying the request
+        """
+        payload = json.dumps(
+            {"m": model, "p": prompt, "params": params}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from LLMCache.key()
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def set(self, key: str, response: Any):
+        """
+        Store a response, evicting the least recently used one if full.
+
+        None responses are not cached.
+
+        Args:
+            key: Key from LLMCache.key()
+            response: The response to cache
+        """
+        if response is None:
+            return
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every cached response and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
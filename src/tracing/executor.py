@@ -0,0 +1,23 @@
+"""
+Executor module for running traced work on worker threads.
+"""
+
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class ContextPreservingThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    A thread pool that runs each task inside a copy of the submitter's context.
+
+    Worker threads do not inherit context variables, so spans opened on a
+    worker would otherwise lose their parent. Copying the context at submit
+    time keeps the tracer's span stack, so work fanned out from inside a span
+    is nested under it. map() and asyncio's run_in_executor() both go through
+    submit() and are covered as well.
+    """
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        ctx = contextvars.copy_context()
+        return super().submit(ctx.run, fn, *args, **kwargs)
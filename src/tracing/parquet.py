@@ -0,0 +1,225 @@
+"""
+Parquet module for writing and reading trace logs in a columnar format.
+
+Requires the optional ``pyarrow`` dependency (``pip install "tr-ai-cing[parquet]"``).
+"""
+
+import atexit
+import json
+import weakref
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+
+# Span fields stored as plain string columns. Parquet dictionary-encodes
+# them on disk, so repeated names, models and providers cost next to nothing.
+_STRING_COLUMNS = (
+    "span_id",
+    "trace_id",
+    "parent_span_id",
+    "name",
+    "type",
+    "status",
+    "model",
+    "provider",
+    "start_time",
+    "end_time",
+    "error",
+)
+
+# Span fields with arbitrary shape, stored as JSON strings
+_JSON_COLUMNS = ("input", "output", "metadata")
+
+# Fields that are left out of a loaded span when they were never set
+_OPTIONAL_FIELDS = ("model", "provider", "error", "input", "output")
+
+_KNOWN_FIELDS = frozenset(_STRING_COLUMNS + _JSON_COLUMNS + ("duration_ms",))
+
+# Open writers, closed at interpreter exit so every file gets its footer
+_live_writers: "weakref.WeakSet[ParquetSpanWriter]" = weakref.WeakSet()
+
+
+def _require_pyarrow():
+    """Raise a helpful error when pyarrow is not installed."""
+    if pa is None:
+        raise ImportError(
+            "Parquet trace logs require pyarrow. "
+            'Install it with: pip install "tr-ai-cing[parquet]"'
+        )
+
+
+def _schema() -> "pa.Schema":
+    """Build the Arrow schema for span records."""
+    fields = [pa.field(name, pa.string()) for name in _STRING_COLUMNS]
+    fields.append(pa.field("duration_ms", pa.float64()))
+    fields.extend(pa.field(name, pa.large_string()) for name in _JSON_COLUMNS)
+    # Any other keys a caller stored on the span, as one JSON object
+    fields.append(pa.field("attributes", pa.large_string()))
+    return pa.schema(fields)
+
+
+def _dumps(value: Any) -> Optional[str]:
+    """Encode a value as JSON, keeping None as a null cell."""
+    if value is None:
+        return None
+    return json.dumps(value, default=str)
+
+
+def _new_columns() -> Dict[str, List[Any]]:
+    """Create empty column buffers, one list per schema field."""
+    names = _STRING_COLUMNS + ("duration_ms",) + _JSON_COLUMNS + ("attributes",)
+    return {name: [] for name in names}
+
+
+def _append_row(columns: Dict[str, List[Any]], data: Dict[str, Any]):
+    """Flatten a span dictionary onto the end of the column buffers."""
+    for name in _STRING_COLUMNS:
+        columns[name].append(data.get(name))
+    columns["duration_ms"].append(data.get("duration_ms"))
+    for name in _JSON_COLUMNS:
+        columns[name].append(_dumps(data.get(name)))
+    extra = {k: v for k, v in data.items() if k not in _KNOWN_FIELDS}
+    columns["attributes"].append(_dumps(extra) if extra else None)
+
+
+def _from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a span dictionary from a Parquet row, which may hold only some columns."""
+    span = {name: row[name] for name in _STRING_COLUMNS if name in row}
+    if "duration_ms" in row:
+        span["duration_ms"] = row["duration_ms"]
+    for name in _JSON_COLUMNS:
+        if name in row:
+            value = row[name]
+            span[name] = json.loads(value) if value is not None else None
+    if "metadata" in span and span["metadata"] is None:
+        span["metadata"] = {}
+    for name in _OPTIONAL_FIELDS:
+        if name in span and span[name] is None:
+            del span[name]
+    if row.get("attributes") is not None:
+        span.update(json.loads(row["attributes"]))
+    return span
+
+
+class ParquetSpanWriter:
+    """
+    A writer that buffers span records and writes them as Parquet row groups.
+
+    Spans are buffered column by column, the layout Arrow builds tables from
+    directly, and string columns are dictionary-encoded so repeated names,
+    models and providers are stored once per row group.
+
+    Parquet files are only readable once their footer is written, so the
+    writer must be closed (directly, via Tracer.close(), when its Tracer is
+    garbage collected, or at interpreter exit) before the log is loaded.
+    """
+
+    def __init__(
+        self,
+        log_file: Union[str, Path],
+        row_group_size: int = 65536,
+        compression: str = "zstd"
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            log_file: Path to the Parquet file (overwritten if it exists)
+            row_group_size: Number of spans buffered per row group (default: 65536)
+            compression: Parquet compression codec (default: "zstd")
+        """
+        _require_pyarrow()
+        self.log_file = Path(log_file)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self._schema = _schema()
+        self._columns = _new_columns()
+        self._row_count = 0
+        self._writer: Optional["pq.ParquetWriter"] = None
+        self._closed = False
+        _live_writers.add(self)
+
+    def write(self, data: Dict[str, Any]):
+        """
+        Buffer a span record, writing a row group once enough are collected.
+
+        Args:
+            data: The span data to write
+        """
+        if self._closed:
+            raise ValueError(f"Parquet trace log {self.log_file} is already closed")
+        _append_row(self._columns, data)
+        self._row_count += 1
+        if self._row_count >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write any buffered spans as a row group."""
+        if not self._row_count:
+            return
+        table = pa.Table.from_pydict(self._columns, schema=self._schema)
+        self._open().write_table(table, row_group_size=self.row_group_size)
+        self._columns = _new_columns()
+        self._row_count = 0
+
+    def close(self):
+        """Write buffered spans and finalize the file."""
+        if self._closed:
+            return
+        self.flush()
+        # Always produce a readable file, even when nothing was logged
+        self._open().close()
+        self._closed = True
+        _live_writers.discard(self)
+
+    def _open(self) -> "pq.ParquetWriter":
+        """Return the underlying Parquet writer, creating the file on first use."""
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(
+                str(self.log_file),
+                self._schema,
+                compression=self.compression,
+                use_dictionary=True
+            )
+        return self._writer
+
+
+def read_parquet_spans(
+    log_file: Union[str, Path],
+    columns: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Read span records from a Parquet trace log.
+
+    The file is decoded one record batch at a time, so the whole Arrow table
+    and its Python rows never have to be in memory together.
+
+    Args:
+        log_file: Path to the Parquet file
+        columns: Only read these columns (default: all). Skipping the input
+            and output columns avoids decoding large payloads when only the
+            span structure is needed.
+
+    Returns:
+        The spans as dictionaries in the same shape as JSONL records
+    """
+    _require_pyarrow()
+    spans: List[Dict[str, Any]] = []
+    for batch in pq.ParquetFile(str(log_file)).iter_batches(columns=columns):
+        spans.extend(_from_row(row) for row in batch.to_pylist())
+    return spans
+
+
+def _close_live_writers():
+    for writer in list(_live_writers):
+        writer.close()
+
+
+atexit.register(_close_live_writers)
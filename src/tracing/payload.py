@@ -0,0 +1,90 @@
+"""
+Payload module for compressing and deduplicating large span inputs and outputs.
+
+The "zstd" codec requires the optional ``zstandard`` dependency
+(``pip install "tr-ai-cing[zstd]"``); "zlib" only needs the standard library.
+"""
+
+import base64
+import hashlib
+import zlib
+from typing import Any, Dict
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+# Span fields whose large string values are packed
+PAYLOAD_FIELDS = ("input", "output")
+
+CODECS = ("zlib", "zstd")
+
+# Reserved key marking a packed payload or a reference to one, which ordinary
+# input and output dictionaries are not expected to use
+PAYLOAD_REF_KEY = "_tracer_payload"
+
+
+def require_codec(codec: str):
+    """Raise a helpful error when a payload codec is unknown or unavailable."""
+    if codec not in CODECS:
+        raise ValueError(f"Unsupported payload compression: {codec!r}")
+    if codec == "zstd" and zstandard is None:
+        raise ImportError(
+            "zstd payload compression requires zstandard. "
+            'Install it with: pip install "tr-ai-cing[zstd]"'
+        )
+
+
+def payload_ref(value: str) -> str:
+    """Return the content address of a payload string."""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def pack_payload(value: str, codec: str, ref: str) -> Dict[str, str]:
+    """
+    Compress a payload string into its first-occurrence record.
+
+    Args:
+        value: The payload
+        codec: "zlib" or "zstd"
+        ref: The payload's payload_ref()
+
+    Returns:
+        A dictionary holding the ref and the base64-encoded compressed bytes
+    """
+    raw = value.encode("utf-8")
+    if codec == "zstd":
+        compressed = zstandard.ZstdCompressor().compress(raw)
+    else:
+        compressed = zlib.compress(raw)
+    return {PAYLOAD_REF_KEY: ref, f"_{codec}_b64": base64.b64encode(compressed).decode("ascii")}
+
+
+def is_packed(value: Any) -> bool:
+    """Whether a span field holds a packed payload or a reference to one."""
+    return isinstance(value, dict) and PAYLOAD_REF_KEY in value
+
+
+def is_compressed(value: Dict[str, str]) -> bool:
+    """Whether a packed payload holds the compressed bytes rather than only a reference."""
+    return any(f"_{codec}_b64" in value for codec in CODECS)
+
+
+def unpack_payload(value: Dict[str, str]) -> str:
+    """
+    Decompress a first-occurrence payload record.
+
+    Args:
+        value: A record from pack_payload()
+
+    Returns:
+        The original payload string
+    """
+    if "_zstd_b64" in value:
+        require_codec("zstd")
+        raw = zstandard.ZstdDecompressor().decompress(base64.b64decode(value["_zstd_b64"]))
+    else:
+        raw = zlib.decompress(base64.b64decode(value["_zlib_b64"]))
+    return raw.decode("utf-8")
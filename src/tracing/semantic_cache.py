@@ -0,0 +1,194 @@
+"""
+Semantic cache module for reusing LLM responses to paraphrased prompts.
+
+Requires the optional ``numpy`` dependency (``pip install "tr-ai-cing[semantic]"``).
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+def _require_numpy():
+    """Raise a helpful error when numpy is not installed."""
+    if np is None:
+        raise ImportError(
+            "The semantic cache requires numpy. "
+            'Install it with: pip install "tr-ai-cing[semantic]"'
+        )
+
+
+class SemanticCache:
+    """
+    An in-memory cache matching prompts by embedding similarity.
+
+    Prompts are embedded with a caller-supplied function (e.g. a
+    sentence-transformers model or an embeddings API) and kept
+    L2-normalized in one contiguous float32 matrix, so a lookup is a single
+    matrix-vector product. A prompt hits when its cosine similarity to a
+    cached prompt is at least ``threshold``. The model is not part of the
+    key; use one cache per model. It can be passed to
+    Tracer.cached_llm_call() in place of an LLMCache.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Sequence[float]],
+        threshold: float = 0.9,
+        maxsize: int = 10000
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            embed: Function returning the embedding vector of a prompt
+            threshold: Minimum cosine similarity for a hit (default: 0.9)
+            maxsize: Maximum number of responses kept, at least 1; the
+                oldest are dropped first (default: 10000)
+        """
+        _require_numpy()
+        if maxsize < 1:
+            raise ValueError(f"Semantic cache maxsize must be at least 1, got {maxsize!r}")
+        self.embed = embed
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._embeddings: Optional["np.ndarray"] = None
+        self._prompts: List[str] = []
+        self._responses: List[Any] = []
+        # The most recent lookup, so a miss followed by set() embeds once
+        self._last: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: Optional[str], prompt: Any, **params: Any) -> str:
+        """
+        Build the cache key for a request: the prompt text.
+
+        Args:
+            model: Model name (ignored)
+            prompt: Prompt sent to the model
+            **params: Generation parameters (ignored)
+
+        Returns:
+            The prompt as a string
+        """
+        return prompt if isinstance(prompt, str) else json.dumps(prompt, default=str)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up the response to the most similar cached prompt.
+
+        Args:
+            key: Prompt text
+
+        Returns:
+            The cached response, or None if no prompt is similar enough
+        """
+        query = self._embed(key)
+        with self._lock:
+            self._last = (key, query)
+            if self._responses:
+                scores = self._embeddings[:len(self._responses)] @ query
+                best = int(scores.argmax())
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    return self._responses[best]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: Any):
+        """
+        Store the response to a prompt.
+
+        None responses are not cached.
+
+        Args:
+            key: Prompt text
+            response: The response to cache
+        """
+        if response is None:
+            return
+        with self._lock:
+            last = self._last
+        vector = last[1] if last is not None and last[0] == key else self._embed(key)
+        with self._lock:
+            self._append(key, vector, response)
+
+    def save(self, path: Union[str, Path]):
+        """
+        Write the cache to ``<path>.npy`` (embeddings) and ``<path>.jsonl``
+        (prompts and responses).
+
+        Args:
+            path: Path prefix for the two files
+        """
+        path = Path(path)
+        with self._lock:
+            count = len(self._responses)
+            embeddings = self._embeddings[:count] if count else np.empty((0, 0), np.float32)
+            np.save(path.with_suffix(".npy"), embeddings)
+            with open(path.with_suffix(".jsonl"), "w", encoding="utf-8") as f:
+                for prompt, response in zip(self._prompts, self._responses):
+                    f.write(json.dumps({"prompt": prompt, "response": response}, default=str))
+                    f.write("\n")
+
+    def load(self, path: Union[str, Path]):
+        """
+        Add the entries written by save() to this cache.
+
+        Args:
+            path: Path prefix passed to save()
+        """
+        path = Path(path)
+        embeddings = np.load(path.with_suffix(".npy"))
+        with open(path.with_suffix(".jsonl"), "r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        with self._lock:
+            for vector, entry in zip(embeddings, entries):
+                self._append(entry["prompt"], vector, entry["response"])
+
+    def clear(self):
+        """Remove every cached response and reset the hit/miss counters."""
+        with self._lock:
+            self._embeddings = None
+            self._prompts = []
+            self._responses = []
+            self._last = None
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def _embed(self, text: str) -> "np.ndarray":
+        """Embed a prompt as an L2-normalized float32 vector."""
+        vector = np.asarray(self.embed(text), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _append(self, prompt: str, vector: "np.ndarray", response: Any):
+        """Add an entry, growing the matrix geometrically. Caller holds the lock."""
+        count = len(self._responses)
+        if count >= self.maxsize:
+            # Drop the oldest entry to make room
+            self._embeddings[:count - 1] = self._embeddings[1:count]
+            del self._prompts[0]
+            del self._responses[0]
+            count -= 1
+        if self._embeddings is None:
+            self._embeddings = np.empty((16, vector.shape[0]), dtype=np.float32)
+        elif count == self._embeddings.shape[0]:
+            grown = np.empty((min(count * 2, self.maxsize), self._embeddings.shape[1]), dtype=np.float32)
+            grown[:count] = self._embeddings
+            self._embeddings = grown
+        self._embeddings[count] = vector
+        self._prompts.append(prompt)
+        self._responses.append(response)
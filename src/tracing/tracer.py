@@ -2,15 +2,177 @@
 Tracer module for logging LLM calls to structured log files.
 """
 
+import asyncio
+import atexit
+import itertools
 import json
+import os
+import secrets
 import time
-import uuid
-from contextlib import contextmanager
-from datetime import datetime, timezone
+import weakref
+import zlib
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from threading import Lock
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from .cache import LLMCache
+from .executor import ContextPreservingThreadPoolExecutor
+from .parquet import ParquetSpanWriter
+from .payload import (
+    PAYLOAD_FIELDS, PAYLOAD_REF_KEY, pack_payload, payload_ref, require_codec
+)
+from .semantic_cache import SemanticCache
+from .writer import (
+    OVERFLOW_POLICIES, _WriterThread, acquire_writer, open_log_file, release_writer
+)
+
+
+# Span and trace ids are a random per-process prefix followed by a counter,
+# which is far cheaper than a uuid4 per id while staying unique across processes
+_id_prefix = secrets.token_hex(6)
+_id_counter = itertools.count()
+
+
+def _new_id() -> str:
+    """Generate a unique span or trace id."""
+    return f"{_id_prefix}{next(_id_counter):012x}"
+
+
+def _reseed_ids():
+    """Give a forked child its own id prefix so it never repeats the parent's ids."""
+    global _id_prefix, _id_counter
+    _id_prefix = secrets.token_hex(6)
+    _id_counter = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_ids)
+
+
+# Open span ids of every tracer, keyed by Tracer._stack_key. Each thread and
+# asyncio task sees its own stacks. The variable is shared rather than one per
+# tracer because a context keeps every variable ever set in it, so tracers
+# created per request would otherwise grow it without bound. The mapping is
+# replaced, never mutated, so contexts never see each other's changes.
+_span_stacks: ContextVar[Dict[int, Tuple[str, ...]]] = ContextVar(
+    "tracing_span_stacks", default={}
+)
+_stack_keys = itertools.count()
+
+
+# Last whole second formatted by _ns_to_iso() and its "YYYY-MM-DDTHH:MM:SS" text
+_iso_seconds_cache: Tuple[Optional[int], str] = (None, "")
+
+
+def _ns_to_iso(timestamp_ns: int) -> str:
+    """
+    Format a time.time_ns() timestamp as an ISO 8601 UTC string.
+    
+    The date and time-of-day part is formatted once per second and reused,
+    which makes this considerably cheaper than datetime.isoformat().
+    """
+    global _iso_seconds_cache
+    seconds, remainder_ns = divmod(timestamp_ns, 1_000_000_000)
+    cached_seconds, prefix = _iso_seconds_cache
+    if seconds != cached_seconds:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+        _iso_seconds_cache = (seconds, prefix)
+    return f"{prefix}.{remainder_ns // 1000:06d}+00:00"
+
+
+class Span:
+    """
+    A context manager that records a single span of a trace.
+    
+    Entering the span pushes it onto the tracer's span stack and returns a
+    dictionary for the caller to store span data in; exiting records timing
+    and status and writes the entry to the log.
+    """
+    
+    __slots__ = (
+        "_tracer", "_name", "_span_type", "_metadata", "_data",
+        "_start_wall_ns", "_start_ns", "_token"
+    )
+    
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        span_type: str,
+        metadata: Optional[Dict[str, Any]]
+    ):
+        self._tracer = tracer
+        self._name = name
+        self._span_type = span_type
+        self._metadata = metadata
+    
+    def __enter__(self) -> Dict[str, Any]:
+        tracer = self._tracer
+        span_id = _new_id()
+        stacks = _span_stacks.get()
+        stack = stacks.get(tracer._stack_key, ())
+        parent_span_id = stack[-1] if stack else None
+        
+        # Initialize trace if not started
+        if tracer._trace_id is None:
+            tracer.start_trace()
+        
+        self._token = _span_stacks.set({**stacks, tracer._stack_key: stack + (span_id,)})
+        
+        self._start_wall_ns = time.time_ns()
+        self._data = {
+            "span_id": span_id,
+            "trace_id": tracer._trace_id,
+            "parent_span_id": parent_span_id,
+            "name": self._name,
+            "type": self._span_type,
+            "metadata": self._metadata or {},
+            "start_time": _ns_to_iso(self._start_wall_ns),
+        }
+        self._start_ns = time.perf_counter_ns()
+        return self._data
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        duration_ns = time.perf_counter_ns() - self._start_ns
+        span_data = self._data
+        # Derive the end from the monotonic duration so the two always agree
+        span_data["end_time"] = _ns_to_iso(self._start_wall_ns + duration_ns)
+        span_data["duration_ms"] = duration_ns / 1_000_000
+        
+        if exc_type is not None and issubclass(exc_type, Exception):
+            span_data["error"] = str(exc_value)
+            span_data["status"] = "error"
+        else:
+            span_data["status"] = "success"
+        
+        try:
+            self._tracer._write_log(span_data)
+        finally:
+            _span_stacks.reset(self._token)
+        return False
+
+
+class _NoopSpan:
+    """A span handed out by disabled tracers; it records nothing."""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> Dict[str, Any]:
+        # A fresh dictionary so callers can still assign span data
+        return {}
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        return False
+
+
+_DISABLED_SPAN = _NoopSpan()
+
 
 class Tracer:
     """
@@ -21,23 +183,135 @@ class Tracer:
     data transformations and error identification.
     """
     
-    def __init__(self, log_file: Union[str, Path] = "trace.jsonl", auto_flush: bool = True):
+    def __init__(
+        self,
+        log_file: Union[str, Path] = "trace.jsonl",
+        auto_flush: bool = True,
+        background: bool = False,
+        buffer_bytes: int = 32768,
+        intern_strings: bool = False,
+        format: Optional[str] = None,
+        enabled: bool = True,
+        max_queue_size: int = 0,
+        on_overflow: str = "block",
+        sample_rate: float = 1.0,
+        keep_errors: bool = False,
+        shard_by_pid: bool = False,
+        payload_compression: Optional[str] = None,
+        payload_threshold: int = 1024
+    ):
         """
         Initialize the Tracer.
         
         Args:
-            log_file: Path to the log file (default: "trace.jsonl")
+            log_file: Path to the log file (default: "trace.jsonl"). JSONL
+                logs whose name ends in ".zst" are written zstd-compressed,
+                which needs the optional zstandard dependency.
             auto_flush: Whether to flush after each write (default: True)
+            background: Whether to hand writes to a background writer thread
+                (default: False). Records are buffered and only guaranteed to
+                be on disk after flush(), end_trace() or close().
+            buffer_bytes: Bytes the background writer accumulates before
+                writing (default: 32768)
+            intern_strings: Whether to replace repeated span names, types,
+                models and providers with small integer ids (default: False).
+                Each string is written once per trace as an intern record.
+            format: Log format, "jsonl" or "parquet" (default: inferred from
+                the log file extension). Parquet needs the optional pyarrow
+                dependency, overwrites the file, and is only readable after
+                close().
+            enabled: Whether to record anything at all (default: True). A
+                disabled tracer hands out a shared no-op span.
+            max_queue_size: Most records the background writer holds in
+                memory, or 0 for no limit (default: 0)
+            on_overflow: What a full background queue does with a new record:
+                "block" the caller, "drop_newest" or "drop_oldest"
+                (default: "block"). Drops are counted in dropped_records and
+                reported in the log as {"_tracer_drop": N} records.
+            sample_rate: Fraction of traces to record, decided once per trace
+                from its id (default: 1.0)
+            keep_errors: Whether to also record every trace that is not
+                sampled but contains an error span (default: False). The
+                spans of unsampled traces are then held in memory until the
+                trace errors or ends.
+            shard_by_pid: Whether each process writes its own
+                "<name>.pid<pid><suffix>" file next to log_file, so worker
+                processes never append to the same file (default: False).
+                Visualizer(log_file) merges the shards.
+            payload_compression: "zlib" or "zstd" to compress string inputs
+                and outputs longer than payload_threshold in JSONL logs, or
+                None to store them as is (default: None). A payload repeated
+                within a trace is stored once and referenced by its SHA-256
+                afterwards. "zstd" needs the optional zstandard dependency.
+            payload_threshold: Length in characters above which payloads are
+                compressed (default: 1024)
         """
         self.log_file = Path(log_file)
         self.auto_flush = auto_flush
+        self.background = background
+        self.buffer_bytes = buffer_bytes
+        self.intern_strings = intern_strings
+        self.enabled = enabled
+        if format is None:
+            format = "parquet" if self.log_file.suffix == ".parquet" else "jsonl"
+        if format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unsupported log format: {format!r}")
+        self.format = format
+        if on_overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported overflow policy: {on_overflow!r}")
+        self.max_queue_size = max_queue_size
+        self.on_overflow = on_overflow
+        if payload_compression is not None:
+            require_codec(payload_compression)
+        self.payload_compression = payload_compression
+        self.payload_threshold = payload_threshold
+        self.sample_rate = sample_rate
+        self.keep_errors = keep_errors
         self._lock = Lock()
-        self._span_stack: List[str] = []
+        # This tracer's entry in the shared stacks of open spans
+        self._stack_key = next(_stack_keys)
         self._trace_id: Optional[str] = None
+        # Whether the current trace is recorded, and the spans held back
+        # from an unsampled one in case it errors
+        self._sampled = True
+        self._held: List[Dict[str, Any]] = []
+        self._writer: Optional[_WriterThread] = None
+        self._parquet_writer: Optional[ParquetSpanWriter] = None
+        # Finalizer writing the buffered spans if the tracer is garbage
+        # collected unclosed
+        self._parquet_finalizer: Optional[weakref.finalize] = None
+        # Parquet files cannot be appended to, so a closed one stays closed
+        self._parquet_closed = False
+        self._interns: Dict[str, int] = {}
+        self._interns_trace_id: Optional[str] = None
+        # Refs of the payloads already written in full for the current trace
+        self._payload_refs: set = set()
+        self._payload_refs_trace_id: Optional[str] = None
+        # Append handle kept open across synchronous writes, and the
+        # finalizer closing it if the tracer is garbage collected unclosed
+        self._file = None
+        self._file_finalizer: Optional[weakref.finalize] = None
+        self._writes_since_check = 0
+        self.shard_by_pid = shard_by_pid
+        self._unsharded_log_file = self.log_file
+        self._shard_pid: Optional[int] = None
+        if shard_by_pid:
+            self._reshard()
         
         # Ensure log directory exists
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
     
+    @property
+    def dropped_records(self) -> int:
+        """Records the background writer has dropped because its queue was full."""
+        writer = self._writer
+        return writer.dropped if writer is not None else 0
+    
+    @property
+    def _span_stack(self) -> Tuple[str, ...]:
+        """The span ids currently open in this context, outermost first."""
+        return _span_stacks.get().get(self._stack_key, ())
+    
     def start_trace(self, trace_id: Optional[str] = None) -> str:
         """
         Start a new trace.
@@ -49,22 +323,71 @@ class Tracer:
             The trace ID
         """
         if trace_id is None:
-            trace_id = str(uuid.uuid4())
+            trace_id = _new_id()
         self._trace_id = trace_id
+        # crc32 rather than hash() so every process makes the same decision
+        self._sampled = self.sample_rate >= 1.0 or (
+            zlib.crc32(trace_id.encode("utf-8")) < self.sample_rate * 0x100000000
+        )
+        self._held = []
         return trace_id
     
     def end_trace(self):
         """End the current trace."""
         self._trace_id = None
-        self._span_stack.clear()
+        self._sampled = True
+        self._held = []
+        stacks = _span_stacks.get()
+        if self._stack_key in stacks:
+            _span_stacks.set({k: v for k, v in stacks.items() if k != self._stack_key})
+        self.flush()
+    
+    def flush(self):
+        """
+        Block until all buffered records have been written to the log file.
+        
+        Parquet logs are left alone: their spans are written a full row
+        group at a time and the file is only readable after close(), so
+        flushing per trace would only cut tiny, poorly compressed row groups.
+        """
+        if self._file is not None:
+            with self._lock:
+                if self._file is not None:
+                    self._file.flush()
+        if self._writer is not None:
+            self._writer.flush()
+    
+    def __enter__(self) -> "Tracer":
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+    
+    def close(self):
+        """Write any buffered records, close the log file and stop the background writer."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+            file, self._file = self._file, None
+        if file is not None:
+            self._file_finalizer.detach()
+            file.close()
+            _open_tracers.discard(self)
+        if writer is not None:
+            release_writer(writer)
+        with self._lock:
+            parquet_writer, self._parquet_writer = self._parquet_writer, None
+            if parquet_writer is not None:
+                self._parquet_finalizer.detach()
+                parquet_writer.close()
+                self._parquet_closed = True
     
-    @contextmanager
     def span(
         self,
         name: str,
         span_type: str = "llm_call",
         metadata: Optional[Dict[str, Any]] = None
-    ):
+    ) -> "Union[Span, _NoopSpan]":
         """
         Context manager for tracing a span (e.g., an LLM call).
         
@@ -73,48 +396,29 @@ class Tracer:
             span_type: Type of span (default: "llm_call")
             metadata: Additional metadata to log
             
-        Yields:
-            A dictionary to store span data (inputs, outputs, etc.)
+        Returns:
+            A context manager that yields a dictionary to store span data
+            (inputs, outputs, etc.)
         """
-        span_id = str(uuid.uuid4())
-        parent_span_id = self._span_stack[-1] if self._span_stack else None
-        
-        # Initialize trace if not started
-        if self._trace_id is None:
-            self.start_trace()
-        
-        self._span_stack.append(span_id)
-        
-        span_data = {
-            "span_id": span_id,
-            "trace_id": self._trace_id,
-            "parent_span_id": parent_span_id,
-            "name": name,
-            "type": span_type,
-            "metadata": metadata or {},
-            "start_time": datetime.now(timezone.utc).isoformat(),
-        }
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return Span(self, name, span_type, metadata)
+    
+    def executor(self, max_workers: Optional[int] = None) -> ContextPreservingThreadPoolExecutor:
+        """
+        Create a thread pool whose tasks keep the submitting context.
         
-        start = time.time()
-        error = None
+        Spans opened by submitted tasks are nested under the span that was
+        open when the task was submitted.
         
-        try:
-            yield span_data
-        except Exception as e:
-            error = str(e)
-            span_data["error"] = error
-            raise
-        finally:
-            span_data["end_time"] = datetime.now(timezone.utc).isoformat()
-            span_data["duration_ms"] = (time.time() - start) * 1000
-            
-            if error is None:
-                span_data["status"] = "success"
-            else:
-                span_data["status"] = "error"
+        Args:
+            max_workers: Maximum number of worker threads (default: the
+                ThreadPoolExecutor default)
             
-            self._write_log(span_data)
-            self._span_stack.pop()
+        Returns:
+            A ContextPreservingThreadPoolExecutor
+        """
+        return ContextPreservingThreadPoolExecutor(max_workers=max_workers)
     
     def log_llm_call(
         self,
@@ -136,13 +440,132 @@ class Tracer:
             provider: Provider name (e.g., "openai")
             metadata: Additional metadata
         """
-        with self.span(name, span_type="llm_call", metadata=metadata) as span:
-            span["input"] = input_data
-            span["output"] = output_data
-            if model:
-                span["model"] = model
-            if provider:
-                span["provider"] = provider
+        if not self.enabled:
+            return
+        
+        # Built directly rather than through span(): there is no body to time
+        # and no exception to catch, so the context manager is pure overhead
+        if self._trace_id is None:
+            self.start_trace()
+        stack = self._span_stack
+        self._write_log(self._llm_call_record(
+            name, input_data, output_data, model, provider, metadata,
+            stack[-1] if stack else None, _ns_to_iso(time.time_ns())
+        ))
+    
+    def log_llm_call_many(self, calls: List[Dict[str, Any]]):
+        """
+        Log several LLM calls at once with a single write.
+        
+        Each call is logged as a sibling span under the currently open span,
+        exactly as if log_llm_call() had been called for it.
+        
+        Args:
+            calls: Dictionaries of log_llm_call() keyword arguments (name,
+                input_data, output_data and optionally model, provider and
+                metadata)
+        """
+        if not self.enabled or not calls:
+            return
+        
+        if self._trace_id is None:
+            self.start_trace()
+        stack = self._span_stack
+        parent_span_id = stack[-1] if stack else None
+        timestamp = _ns_to_iso(time.time_ns())
+        
+        entries = [
+            self._llm_call_record(
+                call["name"], call["input_data"], call["output_data"],
+                call.get("model"), call.get("provider"), call.get("metadata"),
+                parent_span_id, timestamp
+            )
+            for call in calls
+        ]
+        
+        self._write_logs(entries)
+    
+    def cached_llm_call(
+        self,
+        name: str,
+        input_data: Any,
+        call: Callable[[Any], Any],
+        cache: Union[LLMCache, SemanticCache],
+        model: Optional[str] = None,
+        provider: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Make an LLM call through a response cache and log it.
+        
+        The call is skipped when an identical request (or, with a
+        SemanticCache, a similar enough prompt) was cached earlier.
+        Either way the call is logged, with metadata["cache"] set to "hit"
+        or "miss".
+        
+        Args:
+            name: Name/description of the LLM call
+            input_data: Input to the LLM, passed to call()
+            call: Function performing the LLM call, given input_data
+            cache: The cache to consult and fill
+            model: Model name (e.g., "gpt-4")
+            provider: Provider name (e.g., "openai")
+            metadata: Additional metadata
+            
+        Returns:
+            The (possibly cached) output of the LLM call
+        """
+        key = cache.key(model, input_data)
+        output_data = cache.get(key)
+        if output_data is None:
+            output_data = call(input_data)
+            cache.set(key, output_data)
+            status = "miss"
+        else:
+            status = "hit"
+        
+        self.log_llm_call(
+            name, input_data, output_data, model=model, provider=provider,
+            metadata={**(metadata or {}), "cache": status}
+        )
+        return output_data
+    
+    def _llm_call_record(
+        self,
+        name: str,
+        input_data: Any,
+        output_data: Any,
+        model: Optional[str],
+        provider: Optional[str],
+        metadata: Optional[Dict[str, Any]],
+        parent_span_id: Optional[str],
+        timestamp: str
+    ) -> Dict[str, Any]:
+        """
+        Build the span record for a single LLM call.
+        
+        The record has the same fields, in the same order, as one produced
+        by span(), with a zero duration.
+        """
+        entry = {
+            "span_id": _new_id(),
+            "trace_id": self._trace_id,
+            "parent_span_id": parent_span_id,
+            "name": name,
+            "type": "llm_call",
+            "metadata": metadata or {},
+            "start_time": timestamp,
+            "input": input_data,
+            "output": output_data,
+        }
+        if model:
+            entry["model"] = model
+        if provider:
+            entry["provider"] = provider
+        entry["end_time"] = timestamp
+        entry["duration_ms"] = 0.0
+        entry["status"] = "success"
+        return entry
     
     def _write_log(self, data: Dict[str, Any]):
         """
@@ -151,23 +574,400 @@ class Tracer:
         Args:
             data: The data to log
         """
+        self._write_logs([data])
+    
+    def _write_logs(self, entries: List[Dict[str, Any]]):
+        """
+        Write log entries to the file in a single write, if their trace is sampled.
+        
+        Args:
+            entries: The data to log, in order
+        """
+        if self.shard_by_pid and self._shard_pid != os.getpid():
+            # First write since a fork: switch to this process's shard
+            self._reshard()
+        if not self._sampled:
+            entries = self._hold_unsampled(entries)
+            if not entries:
+                return
+        self._emit(entries)
+    
+    def _reshard(self):
+        """Point the tracer at the current process's shard of the log file."""
+        pid = os.getpid()
+        self.log_file = _shard_path(self._unsharded_log_file, pid)
+        self._shard_pid = pid
+        # Writers inherited from a parent process belong to its shard
+        self._writer = None
+        if self._parquet_writer is not None:
+            self._parquet_finalizer.detach()
+        self._parquet_writer = None
+        self._parquet_closed = False
+        if self._file is not None:
+            # Only closes this process's copy of the descriptor
+            self._file_finalizer()
+        self._file = None
+    
+    def _hold_unsampled(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Hold back entries of an unsampled trace.
+        
+        With keep_errors, the held entries are released, and the rest of
+        the trace recorded, as soon as one of them is an error.
+        
+        Args:
+            entries: The data to log, in order
+            
+        Returns:
+            The entries to write now, possibly none
+        """
+        if not self.keep_errors:
+            return []
+        with self._lock:
+            self._held.extend(entries)
+            if not any(data.get("status") == "error" for data in entries):
+                return []
+            held, self._held = self._held, []
+            self._sampled = True
+            return held
+    
+    def _emit(self, entries: List[Dict[str, Any]]):
+        """
+        Write log entries to the file in a single write.
+        
+        Args:
+            entries: The data to log, in order
+        """
+        if self.format == "parquet":
+            with self._lock:
+                if self._parquet_writer is None:
+                    if self._parquet_closed:
+                        raise ValueError(f"Parquet trace log {self.log_file} is already closed")
+                    self._parquet_writer = ParquetSpanWriter(self.log_file)
+                    self._parquet_finalizer = weakref.finalize(
+                        self, self._parquet_writer.close
+                    )
+                for data in entries:
+                    self._parquet_writer.write(data)
+            return
+        
+        payload = self._encode_entries(entries)
+        if self.background:
+            self._get_writer().put(payload)
+            return
+        self._append(payload)
+    
+    def _encode_entries(self, entries: List[Dict[str, Any]]) -> bytes:
+        """
+        Encode log entries as JSON lines, interning strings if enabled.
+        
+        Args:
+            entries: The data to log, in order
+            
+        Returns:
+            The encoded lines as bytes
+        """
+        if self.payload_compression is not None:
+            entries = [self._pack_payloads(data) for data in entries]
+        if self.intern_strings:
+            return b"".join(self._intern_record(data) for data in entries)
+        return b"".join(_encode_record(data) for data in entries)
+    
+    def _append(self, payload: bytes):
+        """
+        Append encoded lines to the log file on the calling thread.
+        
+        Args:
+            payload: The encoded lines
+        """
+        with self._lock:
+            f = self._file
+            if f is None or self._log_file_replaced():
+                f = self._open_log_file()
+            f.write(payload)
+            if self.auto_flush:
+                f.flush()
+    
+    def _log_file_replaced(self) -> bool:
+        """
+        Check, every so many writes, whether the open log file was rotated
+        or deleted. Caller holds the lock.
+        """
+        self._writes_since_check += 1
+        if self._writes_since_check < _REOPEN_CHECK_INTERVAL:
+            return False
+        self._writes_since_check = 0
+        try:
+            return os.stat(self.log_file).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+    
+    def _open_log_file(self):
+        """(Re)open the append handle for synchronous writes. Caller holds the lock."""
+        if self._file is not None:
+            self._file_finalizer.detach()
+            self._file.close()
+        self._file = open_log_file(self.log_file)
+        self._file_finalizer = weakref.finalize(self, self._file.close)
+        self._writes_since_check = 0
+        _open_tracers.add(self)
+        return self._file
+    
+    def _pack_payloads(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Replace large string inputs and outputs with compressed payloads.
+        
+        The first occurrence of a payload in a trace is stored compressed
+        along with its ref; later occurrences only carry the ref.
+        
+        Args:
+            data: The data to log
+            
+        Returns:
+            The data with large payloads packed (a copy if anything changed)
+        """
+        packed = None
+        for field in PAYLOAD_FIELDS:
+            value = data.get(field)
+            if not isinstance(value, str) or len(value) <= self.payload_threshold:
+                continue
+            ref = payload_ref(value)
+            with self._lock:
+                trace_id = data.get("trace_id")
+                if trace_id != self._payload_refs_trace_id:
+                    self._payload_refs = set()
+                    self._payload_refs_trace_id = trace_id
+                seen = ref in self._payload_refs
+                self._payload_refs.add(ref)
+            if packed is None:
+                packed = dict(data)
+            packed[field] = {PAYLOAD_REF_KEY: ref} if seen else pack_payload(
+                value, self.payload_compression, ref
+            )
+        return data if packed is None else packed
+    
+    def _intern_record(self, data: Dict[str, Any]) -> bytes:
+        """
+        Encode a log entry with its repeated strings replaced by intern ids.
+        
+        Any string seen for the first time in the current trace is emitted as
+        an intern record ahead of the entry itself.
+        
+        Args:
+            data: The data to log
+            
+        Returns:
+            The encoded intern records followed by the encoded entry
+        """
+        trace_id = data.get("trace_id")
+        data = dict(data)
+        new_interns = []
+        
         with self._lock:
-            with open(self.log_file, "a") as f:
-                f.write(json.dumps(data) + "\n")
-                if self.auto_flush:
-                    f.flush()
+            if trace_id != self._interns_trace_id:
+                self._interns = {}
+                self._interns_trace_id = trace_id
+            for field in INTERNED_FIELDS:
+                value = data.get(field)
+                if not isinstance(value, str):
+                    continue
+                intern_id = self._interns.get(value)
+                if intern_id is None:
+                    intern_id = self._interns[value] = len(self._interns)
+                    new_interns.append(
+                        {"trace_id": trace_id, "_tracer_intern": intern_id, "value": value}
+                    )
+                data[field] = intern_id
+        
+        return b"".join(_encode_record(r) for r in new_interns) + _encode_record(data)
+    
+    def _get_writer(self) -> _WriterThread:
+        """
+        Return the background writer, starting it on first use.
+        
+        A writer whose thread is no longer running (one inherited across a
+        fork, or stopped by an I/O error) is released and replaced, so
+        records are never queued where nothing will write them.
+        """
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    dead, self._writer = self._writer, acquire_writer(
+                        self.log_file, self.buffer_bytes,
+                        self.max_queue_size, self.on_overflow
+                    )
+                    if dead is not None:
+                        release_writer(dead)
+                writer = self._writer
+        return writer
+
+
+class AsyncTracer(Tracer):
+    """
+    A tracer for asyncio applications that never blocks the event loop on I/O.
+    
+    Records produced on the event loop are queued on an asyncio.Queue and a
+    single consumer task appends them in batches via run_in_executor(), so
+    spans close without waiting on disk. Records produced with no running
+    loop (e.g. on worker threads) are written synchronously. Use aflush()
+    or aclose() instead of flush() and close() from async code.
+    """
+    
+    def __init__(
+        self,
+        log_file: Union[str, Path] = "trace.jsonl",
+        intern_strings: bool = False,
+        enabled: bool = True,
+        sample_rate: float = 1.0,
+        keep_errors: bool = False
+    ):
+        """
+        Initialize the AsyncTracer.
+        
+        Args:
+            log_file: Path to the JSONL log file (default: "trace.jsonl")
+            intern_strings: Whether to replace repeated span names, types,
+                models and providers with small integer ids (default: False)
+            enabled: Whether to record anything at all (default: True)
+            sample_rate: Fraction of traces to record (default: 1.0)
+            keep_errors: Whether to also record unsampled traces that contain
+                an error span (default: False)
+        """
+        super().__init__(
+            log_file, intern_strings=intern_strings, format="jsonl", enabled=enabled,
+            sample_rate=sample_rate, keep_errors=keep_errors
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._drain_task: Optional[asyncio.Task] = None
+    
+    def _emit(self, entries: List[Dict[str, Any]]):
+        payload = self._encode_entries(entries)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._append(payload)
+            return
+        
+        task = self._drain_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._start_draining()
+        self._queue.put_nowait(payload)
+    
+    def _start_draining(self):
+        """Start the consumer task on the running loop, keeping queued records."""
+        leftover = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                leftover.append(self._queue.get_nowait())
+        if leftover:
+            # Queued on a loop whose consumer is gone; write them now
+            self._append(b"".join(leftover))
+        self._queue = asyncio.Queue()
+        self._drain_task = asyncio.get_running_loop().create_task(self._drain(self._queue))
+    
+    async def _drain(self, queue: asyncio.Queue):
+        """Append queued records, batching whatever has accumulated."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await loop.run_in_executor(None, self._append, b"".join(batch))
+            finally:
+                for _ in batch:
+                    queue.task_done()
+    
+    async def aflush(self):
+        """Wait until every record queued so far has been written."""
+        if self._queue is not None and self._drain_task is not None:
+            await self._queue.join()
+    
+    async def aclose(self):
+        """Write any queued records and stop the consumer task."""
+        await self.aflush()
+        task, self._drain_task = self._drain_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.close()
+
+
+# Synchronous writes between checks that the log file was not rotated
+_REOPEN_CHECK_INTERVAL = 64
+
+# Tracers holding an open log file, closed at interpreter exit so nothing
+# buffered is lost
+_open_tracers: "weakref.WeakSet[Tracer]" = weakref.WeakSet()
+
+
+def _close_open_tracers():
+    for tracer in list(_open_tracers):
+        tracer.close()
+
+
+atexit.register(_close_open_tracers)
+
+
+def _shard_path(log_file: Path, pid: int) -> Path:
+    """Return the per-process shard of a log file, e.g. trace.pid1234.jsonl."""
+    return log_file.with_name(f"{log_file.stem}.pid{pid}{log_file.suffix}")
+
+
+# Span fields replaced by small integer ids when string interning is enabled
+INTERNED_FIELDS = ("name", "type", "model", "provider")
+
+
+# Built once: json.dumps() with a default constructs a new encoder per call
+_json_encoder = json.JSONEncoder(default=str)
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+
+def _encode_record(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize a log entry to a newline-terminated JSON line.
+    
+    Uses orjson when it is installed and falls back to the standard library.
+    Values that are not JSON-native are logged via str() rather than failing.
+    
+    Args:
+        data: The data to serialize
+        
+    Returns:
+        The encoded line as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=_ORJSON_OPTIONS)
+    return (_json_encoder.encode(data) + "\n").encode("utf-8")
 
 
 # Global tracer instance
 _default_tracer: Optional[Tracer] = None
+_default_tracer_lock = Lock()
 
 
 def get_default_tracer() -> Tracer:
     """Get or create the default global tracer."""
+    # Fast path: no locking once the tracer exists
+    tracer = _default_tracer
+    if tracer is not None:
+        return tracer
+    return _create_default_tracer()
+
+
+def _create_default_tracer() -> Tracer:
+    """Create the default tracer, taking the lock only on first use."""
     global _default_tracer
-    if _default_tracer is None:
-        _default_tracer = Tracer()
-    return _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer()
+        return _default_tracer
 
 
 def trace_llm_call(
@@ -193,6 +993,8 @@ def trace_llm_call(
     """
     if tracer is None:
         tracer = get_default_tracer()
+    if not tracer.enabled:
+        return
     
     tracer.log_llm_call(
         name=name,
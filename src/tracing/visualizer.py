@@ -2,9 +2,153 @@
 Visualizer module for generating HTML visualizations of trace logs.
 """
 
+import functools
+import html
 import json
+import re
+from array import array
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from .parquet import read_parquet_spans
+from .payload import (
+    PAYLOAD_FIELDS, PAYLOAD_REF_KEY, is_compressed, is_packed, unpack_payload
+)
+from .tracer import INTERNED_FIELDS
+from .writer import open_log_file
+
+
+# Buffer size for reading JSON Lines logs
+_READ_BUFFER_BYTES = 1 << 20
+
+# Buffer size for writing HTML pages, which arrive one small trace at a time
+_WRITE_BUFFER_BYTES = 1 << 20
+
+# String span fields exposed by Visualizer.columns
+COLUMN_FIELDS = ("span_id", "trace_id", "parent_span_id", "name", "type", "status")
+
+# A trace's root spans and its map from parent span id to child spans
+_TraceTree = Tuple[List[Dict[str, Any]], Dict[Optional[str], List[Dict[str, Any]]]]
+
+
+def _resolve_interns(
+    spans: List[Dict[str, Any]],
+    interns: Dict[Tuple[Optional[str], int], str]
+):
+    """Replace interned ids in the given spans with their strings."""
+    for span in spans:
+        trace_id = span.get("trace_id")
+        for field in INTERNED_FIELDS:
+            value = span.get(field)
+            if isinstance(value, int):
+                span[field] = interns.get((trace_id, value), value)
+
+
+def _span_details(span: Dict[str, Any]) -> Dict[str, Any]:
+    """Collect the fields shown when a span is expanded."""
+    details = {
+        "span_id": span.get("span_id", "N/A"),
+        "start_time": span.get("start_time", "N/A"),
+        "duration_ms": span.get("duration_ms", 0),
+    }
+    for field in ("model", "provider", "error", "metadata"):
+        if span.get(field):
+            details[field] = span[field]
+    for field in ("input", "output"):
+        if span.get(field) is not None:
+            details[field] = span[field]
+    return details
+
+
+# html.escape() for span names, types and statuses. The same few values
+# recur across thousands of spans, so each is escaped once and reused.
+_escape_label = functools.lru_cache(maxsize=4096)(html.escape)
+
+
+def _script_json(data: Any) -> str:
+    """Encode a value as compact JSON that is safe inside a <script> element."""
+    if orjson is not None:
+        encoded = orjson.dumps(data, default=str).decode("utf-8")
+    else:
+        encoded = json.dumps(data, default=str, separators=(",", ":"))
+    # "<" only occurs inside JSON strings, where \u003c decodes to the same
+    # text, so no "</script>" or "<!--" can end or confuse the element
+    return encoded.replace("<", "\\u003c")
+
+
+def _chrome_trace_events(traces: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Convert traces to Chrome trace event format complete ("X") events.
+    
+    Each trace gets its own thread, named after the trace id, so Perfetto
+    and chrome://tracing draw one track per trace.
+    """
+    events: List[Dict[str, Any]] = []
+    for tid, (trace_id, spans) in enumerate(traces.items(), start=1):
+        events.append({
+            "name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+            "args": {"name": f"trace {trace_id}"},
+        })
+        for span in spans:
+            start_time = span.get("start_time")
+            if not start_time:
+                continue
+            args = _span_details(span)
+            args["status"] = span.get("status")
+            events.append({
+                "name": span.get("name") or "span",
+                "cat": span.get("type") or "span",
+                "ph": "X",
+                "ts": datetime.fromisoformat(start_time).timestamp() * 1e6,
+                "dur": (span.get("duration_ms") or 0) * 1000,
+                "pid": 1,
+                "tid": tid,
+                "args": args,
+            })
+    return events
+
+
+def _file_snapshot(paths: List[Path]) -> Tuple[Tuple[Path, int, int], ...]:
+    """Identify the current contents of files by their size and modification time."""
+    snapshot = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        snapshot.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(snapshot)
+
+
+def _shard_files(log_file: Path) -> List[Path]:
+    """Find the per-process shards written for log_file by shard_by_pid tracers."""
+    pattern = re.compile(rf"{re.escape(log_file.stem)}\.pid\d+{re.escape(log_file.suffix)}")
+    return sorted(
+        path for path in log_file.parent.glob(f"{log_file.stem}.pid*{log_file.suffix}")
+        if pattern.fullmatch(path.name)
+    )
+
+
+def _resolve_payloads(spans: List[Dict[str, Any]]):
+    """Replace packed and referenced payloads in the given spans with their strings."""
+    payloads: Dict[str, str] = {}
+    for span in spans:
+        for field in PAYLOAD_FIELDS:
+            value = span.get(field)
+            if is_packed(value) and is_compressed(value):
+                payloads[value[PAYLOAD_REF_KEY]] = span[field] = unpack_payload(value)
+    for span in spans:
+        for field in PAYLOAD_FIELDS:
+            value = span.get(field)
+            if is_packed(value):
+                # Left as the bare ref if its first occurrence was lost
+                span[field] = payloads.get(value[PAYLOAD_REF_KEY], value)
 
 
 class Visualizer:
@@ -19,72 +163,171 @@ class Visualizer:
         """
         Initialize the Visualizer.
         
+        Nothing is read here; the log is parsed by the first load_traces()
+        or generate_html() call.
+        
         Args:
             log_file: Path to the trace log file
         """
         self.log_file = Path(log_file)
         self.spans: List[Dict[str, Any]] = []
         self.traces: Dict[str, List[Dict[str, Any]]] = {}
+        # Spans the tracer dropped because its write queue was full
+        self.dropped_spans = 0
+        self._columns: Optional[Dict[str, Any]] = None
+        # Root spans and children map of each trace, built on first render
+        self._trace_trees: Dict[str, _TraceTree] = {}
+        # Size and modification time of the files behind the loaded spans
+        self._loaded_snapshot: Optional[Tuple[Tuple[Path, int, int], ...]] = None
+    
+    @property
+    def columns(self) -> Dict[str, Any]:
+        """
+        The loaded spans' structural fields as columns, in span order.
+        
+        Holds one list per field in COLUMN_FIELDS plus ``duration_ms`` as an
+        ``array("d")``, which ``numpy.frombuffer`` can view without copying.
+        Built on first access after each reload, so filtering and
+        summary statistics scan flat sequences rather than span dicts.
+        """
+        if self._columns is None:
+            spans = self.spans
+            columns: Dict[str, Any] = {
+                field: [span.get(field) for span in spans] for field in COLUMN_FIELDS
+            }
+            columns["duration_ms"] = array(
+                "d", [span.get("duration_ms") or 0.0 for span in spans]
+            )
+            self._columns = columns
+        return self._columns
     
     def load_traces(self):
-        """Load traces from the log file."""
+        """
+        Load traces from the log file.
+        
+        Per-process shards written next to it by a tracer with
+        shard_by_pid=True (e.g. trace.pid1234.jsonl) are merged in, ordered by
+        start time.
+        
+        The files are only parsed again when their size or modification time
+        changed since the last load, so calling this (or generate_html())
+        repeatedly on an unchanged log is cheap.
+        """
+        paths = _shard_files(self.log_file)
+        if self.log_file.exists():
+            paths.insert(0, self.log_file)
+        snapshot = _file_snapshot(paths)
+        if snapshot == self._loaded_snapshot:
+            return
+        
         self.spans = []
         self.traces = {}
+        self.dropped_spans = 0
+        self._columns = None
+        self._trace_trees = {}
+        
+        for path in paths:
+            if path.suffix == ".parquet":
+                self.spans.extend(read_parquet_spans(path))
+            else:
+                self.spans.extend(self._read_jsonl_spans(path))
+        if len(paths) > 1:
+            self.spans.sort(key=lambda span: span.get("start_time") or "")
+        
+        for span in self.spans:
+            trace_id = span.get("trace_id")
+            if trace_id:
+                self.traces.setdefault(trace_id, []).append(span)
+        self._loaded_snapshot = snapshot
+    
+    def _read_jsonl_spans(self, path: Path) -> List[Dict[str, Any]]:
+        """Read spans from a JSON Lines log, resolving interned strings and packed payloads."""
+        spans = []
+        interns: Dict[Tuple[Optional[str], int], str] = {}
+        has_payloads = False
         
-        if not self.log_file.exists():
-            return
+        loads = orjson.loads if orjson is not None else json.loads
         
-        with open(self.log_file, "r") as f:
+        # Read raw bytes: both parsers accept them, which skips a decode step.
+        # A large buffer cuts the number of reads on multi-megabyte logs.
+        with open_log_file(path, "rb", buffering=_READ_BUFFER_BYTES) as f:
             for line in f:
                 if line.strip():
-                    span = json.loads(line)
-                    self.spans.append(span)
-                    
-                    trace_id = span.get("trace_id")
-                    if trace_id:
-                        if trace_id not in self.traces:
-                            self.traces[trace_id] = []
-                        self.traces[trace_id].append(span)
+                    span = loads(line)
+                    if "_tracer_intern" in span:
+                        interns[(span.get("trace_id"), span["_tracer_intern"])] = span["value"]
+                        continue
+                    if "_tracer_drop" in span:
+                        self.dropped_spans += span["_tracer_drop"]
+                        continue
+                    if not has_payloads and b'"_tracer_payload"' in line:
+                        has_payloads = True
+                    spans.append(span)
+        
+        if interns:
+            _resolve_interns(spans, interns)
+        if has_payloads:
+            _resolve_payloads(spans)
+        return spans
     
     def generate_html(self, output_file: Union[str, Path] = "trace_visualization.html"):
         """
         Generate an HTML visualization of the traces.
         
+        The page is written to the file piece by piece, one trace at a time,
+        rather than being assembled in memory first.
+        
         Args:
             output_file: Path to the output HTML file
         """
         self.load_traces()
         
-        html = self._generate_html_content()
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # The page declares a UTF-8 charset, so never write the locale's encoding
+        with open(output_path, "w", encoding="utf-8", buffering=_WRITE_BUFFER_BYTES) as f:
+            f.writelines(self._iter_html_content())
+        
+        return output_path
+    
+    def generate_chrome_trace(self, output_file: Union[str, Path] = "trace_events.json") -> Path:
+        """
+        Write the traces as a Chrome trace event file.
+        
+        Open it in https://ui.perfetto.dev or chrome://tracing, which stay
+        responsive with far more spans than the HTML page. Each span becomes
+        a complete event on its trace's track, with its inputs, outputs and
+        metadata as the event's args.
+        
+        Args:
+            output_file: Path to the output JSON file
+        
+        Returns:
+            The path of the written file
+        """
+        self.load_traces()
         
         output_path = Path(output_file)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_path, "w") as f:
-            f.write(html)
+        document = {"traceEvents": _chrome_trace_events(self.traces), "displayTimeUnit": "ms"}
+        if orjson is not None:
+            output_path.write_bytes(orjson.dumps(document, default=str))
+        else:
+            with open(output_path, "w", encoding="utf-8", buffering=_WRITE_BUFFER_BYTES) as f:
+                json.dump(document, f, default=str)
         
         return output_path
     
     def _generate_html_content(self) -> str:
         """Generate the HTML content."""
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>tr-ai-cing - Trace Visualization</title>
-    <style>
-        {self._get_css()}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>🔍 tr-ai-cing - Trace Visualization</h1>
-            <p class="subtitle">LLM Application Observability</p>
-        </header>
-        
-        <div class="stats">
+        return "".join(self._iter_html_content())
+    
+    def _iter_html_content(self) -> Iterator[str]:
+        """Yield the HTML content in order, one trace per chunk."""
+        yield _PAGE_HEAD
+        yield f"""        <div class="stats">
             <div class="stat-box">
                 <div class="stat-value">{len(self.traces)}</div>
                 <div class="stat-label">Traces</div>
@@ -95,129 +338,113 @@ class Visualizer:
             </div>
         </div>
         
-        {self._generate_traces_html()}
-    </div>
-    
-    <script>
-        {self._get_javascript()}
-    </script>
-</body>
-</html>"""
-        return html
+        """
+        yield from self._iter_traces_html()
+        yield _PAGE_TAIL
     
-    def _generate_traces_html(self) -> str:
-        """Generate HTML for all traces."""
+    def _iter_traces_html(self) -> Iterator[str]:
+        """Yield HTML for all traces."""
         if not self.traces:
-            return '<div class="no-data">No traces found. Start tracing your LLM calls!</div>'
-        
-        traces_html = []
-        for trace_id, spans in self.traces.items():
-            traces_html.append(self._generate_trace_html(trace_id, spans))
+            yield '<div class="no-data">No traces found. Start tracing your LLM calls!</div>'
+            return
         
-        return "\n".join(traces_html)
+        for i, (trace_id, spans) in enumerate(self.traces.items()):
+            out = ["\n"] if i else []
+            self._generate_trace_html(trace_id, spans, out)
+            yield "".join(out)
     
-    def _generate_trace_html(self, trace_id: str, spans: List[Dict[str, Any]]) -> str:
-        """Generate HTML for a single trace."""
-        # Build parent-child relationships
-        span_map = {span["span_id"]: span for span in spans}
-        root_spans = [s for s in spans if not s.get("parent_span_id")]
+    def _generate_trace_html(self, trace_id: str, spans: List[Dict[str, Any]], out: List[str]):
+        """Append the HTML for a single trace to out."""
+        root_spans, children_map = self._trace_tree(trace_id, spans)
         
-        trace_html = f"""
+        out.append(f"""
         <div class="trace-container">
             <div class="trace-header">
-                <h2>Trace: {trace_id[:8]}...</h2>
+                <h2>Trace: {html.escape(trace_id[:8])}...</h2>
                 <span class="span-count">{len(spans)} span(s)</span>
             </div>
             <div class="trace-dag">
-                {self._generate_dag_html(root_spans, span_map)}
+                """)
+        details: List[Dict[str, Any]] = []
+        self._generate_dag_html(root_spans, children_map, out, details)
+        out.append(f"""
             </div>
+            <script type="application/json" class="trace-data">{_script_json(details)}</script>
         </div>
+        """)
+    
+    def _trace_tree(
+        self,
+        trace_id: str,
+        spans: List[Dict[str, Any]]
+    ) -> _TraceTree:
+        """
+        Return a trace's root spans and parent-to-children map.
+        
+        Built in one pass on first use and kept until the next load_traces(),
+        so rendering the same traces again skips the grouping.
         """
-        return trace_html
+        tree = self._trace_trees.get(trace_id)
+        if tree is None:
+            children_map: Dict[Optional[str], List[Dict[str, Any]]] = {}
+            for span in spans:
+                children_map.setdefault(span.get("parent_span_id"), []).append(span)
+            root_spans = [s for s in spans if not s.get("parent_span_id")]
+            tree = self._trace_trees[trace_id] = (root_spans, children_map)
+        return tree
     
     def _generate_dag_html(
         self,
         spans: List[Dict[str, Any]],
-        span_map: Dict[str, Dict[str, Any]],
+        children_map: Dict[Optional[str], List[Dict[str, Any]]],
+        out: List[str],
+        details: List[Dict[str, Any]],
         level: int = 0
-    ) -> str:
-        """Generate HTML for the DAG structure."""
-        if not spans:
-            return ""
-        
-        html_parts = []
-        for span in spans:
-            # Get child spans
-            children = [
-                s for s in span_map.values()
-                if s.get("parent_span_id") == span["span_id"]
-            ]
-            
-            status_class = span.get("status", "unknown")
-            error = span.get("error")
-            
-            html_parts.append(f"""
-            <div class="span-node" style="margin-left: {level * 40}px;">
-                <div class="span-header status-{status_class}" onclick="toggleSpan(this)">
-                    <span class="toggle-icon">▶</span>
-                    <span class="span-name">{span.get('name', 'Unknown')}</span>
-                    <span class="span-type">{span.get('type', 'unknown')}</span>
-                    <span class="span-duration">{span.get('duration_ms', 0):.2f}ms</span>
-                    <span class="span-status">{status_class}</span>
-                </div>
-                <div class="span-details" style="display: none;">
-                    <div class="detail-section">
-                        <strong>Span ID:</strong> {span.get('span_id', 'N/A')}
-                    </div>
-                    {f'<div class="detail-section"><strong>Model:</strong> {span.get("model", "N/A")}</div>' if span.get("model") else ''}
-                    {f'<div class="detail-section"><strong>Provider:</strong> {span.get("provider", "N/A")}</div>' if span.get("provider") else ''}
-                    <div class="detail-section">
-                        <strong>Start Time:</strong> {span.get('start_time', 'N/A')}
-                    </div>
-                    <div class="detail-section">
-                        <strong>Duration:</strong> {span.get('duration_ms', 0):.2f}ms
-                    </div>
-                    {f'<div class="detail-section error-box"><strong>Error:</strong> {error}</div>' if error else ''}
-                    {self._format_io_data(span.get('input'), 'Input')}
-                    {self._format_io_data(span.get('output'), 'Output')}
-                    {self._format_metadata(span.get('metadata'))}
-                </div>
-            </div>
-            """)
-            
+    ):
+        """
+        Append the HTML for the DAG structure to out, and each span's
+        details to details in the same order.
+        """
+        # Depth-first with an explicit stack, so deep traces cannot hit the
+        # recursion limit; children are pushed reversed to keep their order
+        stack = [(span, level) for span in reversed(spans)]
+        while stack:
+            span, depth = stack.pop()
+            out.append(self._generate_span_html(span, depth, len(details)))
+            details.append(_span_details(span))
+            children = children_map.get(span["span_id"])
             if children:
-                html_parts.append(self._generate_dag_html(children, span_map, level + 1))
-        
-        return "\n".join(html_parts)
+                stack.extend((child, depth + 1) for child in reversed(children))
     
-    def _format_io_data(self, data: Any, label: str) -> str:
-        """Format input/output data for display."""
-        if data is None:
-            return ""
+    def _generate_span_html(self, span: Dict[str, Any], level: int, index: int) -> str:
+        """
+        Generate HTML for a single span node.
         
-        formatted_data = json.dumps(data, indent=2) if not isinstance(data, str) else data
-        return f"""
-        <div class="detail-section">
-            <strong>{label}:</strong>
-            <pre class="io-data">{formatted_data}</pre>
-        </div>
+        Only the header is rendered here. The details of every span in a
+        trace are embedded as one JSON array after its DAG, and the page
+        script builds a span's details from entry ``index`` the first time
+        it is expanded, so hidden payloads cost no markup.
         """
-    
-    def _format_metadata(self, metadata: Optional[Dict[str, Any]]) -> str:
-        """Format metadata for display."""
-        if not metadata:
-            return ""
+        # Span fields are arbitrary text, so escape everything interpolated
+        escape = _escape_label
+        status_class = escape(str(span.get("status", "unknown")))
         
         return f"""
-        <div class="detail-section">
-            <strong>Metadata:</strong>
-            <pre class="io-data">{json.dumps(metadata, indent=2)}</pre>
+        <div class="span-node" style="margin-left: {level * 40}px;" data-index="{index}">
+            <div class="span-header status-{status_class}" onclick="toggleSpan(this)">
+                <span class="toggle-icon">▶</span>
+                <span class="span-name">{escape(str(span.get('name', 'Unknown')))}</span>
+                <span class="span-type">{escape(str(span.get('type', 'unknown')))}</span>
+                <span class="span-duration">{span.get('duration_ms', 0):.2f}ms</span>
+                <span class="span-status">{status_class}</span>
+            </div>
+            <div class="span-details" style="display: none;"></div>
         </div>
         """
-    
-    def _get_css(self) -> str:
-        """Get the CSS styles."""
-        return """
+
+
+# Static parts of the page, built once at import rather than on every render
+_CSS = """
         * {
             margin: 0;
             padding: 0;
@@ -433,13 +660,60 @@ class Visualizer:
             font-size: 1.2em;
         }
         """
-    
-    def _get_javascript(self) -> str:
-        """Get the JavaScript code."""
-        return """
+
+_JAVASCRIPT = """
+        function addDetail(details, label, value, className) {
+            const section = document.createElement('div');
+            section.className = 'detail-section' + (className ? ' ' + className : '');
+            const strong = document.createElement('strong');
+            strong.textContent = label + ':';
+            section.appendChild(strong);
+            section.appendChild(document.createTextNode(' ' + value));
+            details.appendChild(section);
+        }
+        
+        function addPreDetail(details, label, value) {
+            const section = document.createElement('div');
+            section.className = 'detail-section';
+            const strong = document.createElement('strong');
+            strong.textContent = label + ':';
+            const pre = document.createElement('pre');
+            pre.className = 'io-data';
+            pre.textContent = typeof value === 'string' ? value : JSON.stringify(value, null, 2);
+            section.appendChild(strong);
+            section.appendChild(pre);
+            details.appendChild(section);
+        }
+        
+        function renderSpanDetails(details, span) {
+            addDetail(details, 'Span ID', span.span_id);
+            if (span.model) addDetail(details, 'Model', span.model);
+            if (span.provider) addDetail(details, 'Provider', span.provider);
+            addDetail(details, 'Start Time', span.start_time);
+            addDetail(details, 'Duration', Number(span.duration_ms).toFixed(2) + 'ms');
+            if (span.error) addDetail(details, 'Error', span.error, 'error-box');
+            if ('input' in span) addPreDetail(details, 'Input', span.input);
+            if ('output' in span) addPreDetail(details, 'Output', span.output);
+            if (span.metadata) addPreDetail(details, 'Metadata', span.metadata);
+        }
+        
+        function traceSpans(element) {
+            // Each trace's details are parsed once, when a span is first expanded
+            const script = element.closest('.trace-container').querySelector('script.trace-data');
+            if (!script.spans) {
+                script.spans = JSON.parse(script.textContent);
+            }
+            return script.spans;
+        }
+        
         function toggleSpan(element) {
             const details = element.nextElementSibling;
             if (details && details.classList.contains('span-details')) {
+                if (!details.dataset.rendered) {
+                    // Details are built from the trace's embedded JSON on first expand
+                    renderSpanDetails(details, traceSpans(element)[element.parentElement.dataset.index]);
+                    details.dataset.rendered = 'true';
+                }
                 if (details.style.display === 'none') {
                     details.style.display = 'block';
                     element.classList.add('expanded');
@@ -450,3 +724,31 @@ class Visualizer:
             }
         }
         """
+
+_PAGE_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>tr-ai-cing - Trace Visualization</title>
+    <style>
+        """ + _CSS + """
+    </style>
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>🔍 tr-ai-cing - Trace Visualization</h1>
+            <p class="subtitle">LLM Application Observability</p>
+        </header>
+        
+"""
+
+_PAGE_TAIL = """
+    </div>
+    
+    <script>
+        """ + _JAVASCRIPT + """
+    </script>
+</body>
+</html>"""
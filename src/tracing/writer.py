@@ -0,0 +1,348 @@
+"""
+Writer module for moving trace log I/O off the calling thread.
+
+Logs whose name ends in ``.zst`` are zstd-compressed, which requires the
+optional ``zstandard`` dependency (``pip install "tr-ai-cing[zstd]"``).
+"""
+
+import atexit
+import io
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+# Sentinel telling a writer thread to drain its queue and exit
+_STOP = object()
+
+# What a bounded writer does with a record when its queue is full
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+# Suffix of JSON Lines logs written as zstd frames
+COMPRESSED_SUFFIX = ".zst"
+
+# Writers shared by every tracer appending to the same file, keyed by the
+# resolved path. Drained at interpreter exit so buffered records are not lost.
+_writers: "Dict[Path, _WriterThread]" = {}
+_writers_lock = threading.Lock()
+
+
+class _ZstdAppendFile:
+    """
+    An append handle that zstd-compresses everything written to it.
+
+    flush() ends a zstd block, which makes everything written so far
+    readable while later records keep compressing against the same frame.
+    close() ends the frame, so the next handle opened on the file appends a
+    new one. Tracers and writer threads are closed at interpreter exit; if
+    a process is killed first its frame is left unfinished, and frames
+    appended to the file after that cannot be decoded.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self._writer = zstandard.ZstdCompressor(level=3).stream_writer(file, closefd=False)
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def write(self, data: bytes):
+        self._writer.write(data)
+
+    def flush(self):
+        self._writer.flush(zstandard.FLUSH_BLOCK)
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            self._writer.flush(zstandard.FLUSH_FRAME)
+            self._file.flush()
+        finally:
+            self._file.close()
+
+
+def open_log_file(log_file: Union[str, Path], mode: str = "ab", buffering: int = -1) -> BinaryIO:
+    """
+    Open a JSON Lines log for appending ("ab") or reading ("rb").
+
+    Logs ending in ``.zst`` are transparently compressed and decompressed.
+
+    Args:
+        log_file: Path to the log file
+        mode: "ab" or "rb" (default: "ab")
+        buffering: Buffer size for reading ("rb" only, default: io default)
+
+    Returns:
+        A binary file object
+    """
+    compressed = Path(log_file).suffix == COMPRESSED_SUFFIX
+    if compressed and zstandard is None:
+        raise ImportError(
+            f"Compressed {COMPRESSED_SUFFIX} trace logs require zstandard. "
+            'Install it with: pip install "tr-ai-cing[zstd]"'
+        )
+    f = open(log_file, mode, buffering=buffering)
+    if not compressed:
+        return f
+    if mode == "ab":
+        return _ZstdAppendFile(f)
+    reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+    return io.BufferedReader(reader, buffer_size=buffering if buffering > 0 else io.DEFAULT_BUFFER_SIZE)
+
+
+class _BoundedQueue(queue.Queue):
+    """A bounded queue that can make room by discarding its oldest record."""
+
+    def put_drop_oldest(self, buf: bytes) -> bool:
+        """
+        Queue a record without blocking, discarding the oldest queued record
+        if the queue is full.
+
+        Flush and stop requests are never discarded. If nothing else is
+        queued, the new record is the one dropped.
+
+        Args:
+            buf: The encoded record
+
+        Returns:
+            Whether a record was dropped
+        """
+        with self.not_full:
+            dropped = False
+            if 0 < self.maxsize <= self._qsize():
+                for i, item in enumerate(self.queue):
+                    if isinstance(item, bytes):
+                        del self.queue[i]
+                        self.unfinished_tasks -= 1
+                        dropped = True
+                        break
+                else:
+                    return True
+            self._put(buf)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            return dropped
+
+
+class _WriterThread(threading.Thread):
+    """
+    A daemon thread that owns a log file handle and appends serialized records.
+
+    Callers push already-encoded lines onto a queue and return immediately;
+    the thread accumulates them and writes in chunks of roughly
+    ``buffer_bytes`` so the hot path never blocks on a syscall. A partial
+    batch is written once its oldest record has waited ``flush_interval``
+    seconds, so a quiet tracer still reaches disk promptly. Obtain one
+    with acquire_writer() so tracers writing to the same file share it.
+
+    With ``max_queue_size`` set, at most that many records wait in memory.
+    Depending on ``on_overflow``, a producer facing a full queue blocks or a
+    record is dropped; dropped records are counted and reported in the log
+    as ``{"_tracer_drop": N}`` records.
+    """
+
+    def __init__(
+        self,
+        log_file: Union[str, Path],
+        buffer_bytes: int = 32768,
+        flush_interval: float = 0.05,
+        max_queue_size: int = 0,
+        on_overflow: str = "block"
+    ):
+        """
+        Initialize the writer thread.
+
+        Args:
+            log_file: Path to the log file to append to
+            buffer_bytes: Number of bytes to accumulate before writing (default: 32768)
+            flush_interval: Longest time in seconds a record waits in the
+                buffer before being written (default: 0.05)
+            max_queue_size: Most records queued before on_overflow applies,
+                or 0 for no limit (default: 0)
+            on_overflow: "block", "drop_newest" or "drop_oldest" (default: "block")
+        """
+        if on_overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported overflow policy: {on_overflow!r}")
+        super().__init__(name=f"tracing-writer:{Path(log_file).name}", daemon=True)
+        self.log_file = Path(log_file)
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.on_overflow = on_overflow
+        if max_queue_size > 0:
+            self._queue = _BoundedQueue(max_queue_size)
+        else:
+            self._queue = queue.SimpleQueue()
+        # Records dropped on overflow, in total and since last reported
+        self.dropped = 0
+        self._unreported_drops = 0
+        self._drops_lock = threading.Lock()
+        # Number of tracers currently sharing this writer
+        self._users = 0
+        # Open eagerly so permission errors surface on the caller's thread
+        self._file = open_log_file(self.log_file)
+
+    def put(self, buf: bytes):
+        """Queue an encoded record for writing, applying the overflow policy."""
+        if self.max_queue_size <= 0 or self.on_overflow == "block":
+            self._queue.put(buf)
+            return
+        if self.on_overflow == "drop_oldest":
+            dropped = self._queue.put_drop_oldest(buf)
+        else:
+            try:
+                self._queue.put_nowait(buf)
+                return
+            except queue.Full:
+                dropped = True
+        if dropped:
+            with self._drops_lock:
+                self.dropped += 1
+                self._unreported_drops += 1
+
+    def flush(self):
+        """Block until every record queued so far has been written."""
+        if not self.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(0.1):
+            if not self.is_alive():
+                return
+
+    def close(self):
+        """Write any pending records, close the file and stop the thread."""
+        if self.is_alive():
+            self._queue.put(_STOP)
+            self.join()
+        elif not self._file.closed:
+            self._file.close()
+
+    def _drop_report(self) -> bytes:
+        """Encode a record counting the drops since the last report."""
+        with self._drops_lock:
+            count, self._unreported_drops = self._unreported_drops, 0
+        return (json.dumps({"_tracer_drop": count}) + "\n").encode("utf-8")
+
+    def run(self):
+        pending: List[bytes] = []
+        pending_bytes = 0
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    # The oldest buffered record has waited flush_interval
+                    item = None
+
+                if isinstance(item, bytes):
+                    if not pending:
+                        deadline = time.monotonic() + self.flush_interval
+                    pending.append(item)
+                    pending_bytes += len(item)
+                    if pending_bytes < self.buffer_bytes:
+                        continue
+
+                # Buffer full, batch due, flush request or stop sentinel
+                if self._unreported_drops:
+                    pending.append(self._drop_report())
+                if pending:
+                    self._file.write(b"".join(pending))
+                    self._file.flush()
+                    pending.clear()
+                    pending_bytes = 0
+                    deadline = None
+                if item is _STOP:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+        finally:
+            self._file.close()
+            # Release anyone still waiting on a flush
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+
+
+def acquire_writer(
+    log_file: Union[str, Path],
+    buffer_bytes: int = 32768,
+    max_queue_size: int = 0,
+    on_overflow: str = "block"
+) -> _WriterThread:
+    """
+    Get the running writer for a log file, starting one if needed.
+
+    Tracers logging to the same file share a single writer thread and file
+    handle. The first tracer's settings are used for the shared writer.
+    Each call must be paired with release_writer().
+
+    Args:
+        log_file: Path to the log file
+        buffer_bytes: Bytes to accumulate before writing (default: 32768)
+        max_queue_size: Most records queued, or 0 for no limit (default: 0)
+        on_overflow: What to do when the queue is full (default: "block")
+
+    Returns:
+        The shared writer thread
+    """
+    key = Path(log_file).resolve()
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None or not writer.is_alive():
+            writer = _WriterThread(
+                key, buffer_bytes, max_queue_size=max_queue_size, on_overflow=on_overflow
+            )
+            writer.start()
+            _writers[key] = writer
+        writer._users += 1
+        return writer
+
+
+def release_writer(writer: _WriterThread):
+    """
+    Release a writer obtained from acquire_writer().
+
+    The writer is drained and stopped once its last user releases it.
+
+    Args:
+        writer: The writer to release
+    """
+    with _writers_lock:
+        writer._users -= 1
+        if writer._users > 0:
+            return
+        if _writers.get(writer.log_file) is writer:
+            del _writers[writer.log_file]
+    writer.close()
+
+
+def _close_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(_close_writers)
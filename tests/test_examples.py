@@ -2,54 +2,68 @@
 Tests for the example scripts.
 
 These tests ensure that all example scripts run successfully and produce
-the expected outputs without errors.
+the expected outputs without errors. The scripts are run in-process, which
+avoids paying interpreter startup and import time for every test.
 """
 
+import contextlib
+import io
 import json
 import pytest
-import subprocess
-import sys
+import runpy
 from pathlib import Path
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def examples_dir():
     """Get the examples directory path."""
     return Path(__file__).parent.parent / "examples"
 
 
+@pytest.fixture(scope="module")
+def run_example(examples_dir, tmp_path_factory):
+    """
+    Run an example script as __main__ in its own directory, once per module.
+    
+    Returns a function taking the script name and returning the directory it
+    ran in and its stdout; later calls for the same script reuse that run.
+    """
+    runs = {}
+    
+    def run(script):
+        if script not in runs:
+            cwd = tmp_path_factory.mktemp(Path(script).stem)
+            stdout = io.StringIO()
+            with pytest.MonkeyPatch.context() as mp, contextlib.redirect_stdout(stdout):
+                mp.chdir(cwd)
+                runpy.run_path(str(examples_dir / script), run_name="__main__")
+            runs[script] = (cwd, stdout.getvalue())
+        return runs[script]
+    return run
+
+
 @pytest.fixture
 def temp_examples_dir(tmp_path):
     """Create a temporary directory for example outputs."""
     return tmp_path / "examples"
 
 
-def test_basic_example_runs_successfully(examples_dir, tmp_path):
+def test_basic_example_runs_successfully(run_example):
     """Test that basic_example.py runs without errors."""
     # Run the basic example
-    result = subprocess.run(
-        [sys.executable, str(examples_dir / "basic_example.py")],
-        cwd=tmp_path,
-        capture_output=True,
-        text=True
-    )
+    _, stdout = run_example("basic_example.py")
     
-    assert result.returncode == 0, f"Script failed with error: {result.stderr}"
-    assert "Started trace:" in result.stdout
-    assert "Trace completed!" in result.stdout
-    assert "Visualization saved to:" in result.stdout
+    assert "Started trace:" in stdout
+    assert "Trace completed!" in stdout
+    assert "Visualization saved to:" in stdout
 
 
-def test_basic_example_creates_trace_file(examples_dir, tmp_path):
+def test_basic_example_creates_trace_file(run_example):
     """Test that basic_example.py creates a valid trace file."""
     # Run the basic example
-    subprocess.run(
-        [sys.executable, str(examples_dir / "basic_example.py")],
-        cwd=tmp_path,
-        capture_output=True
-    )
+    cwd, _ = run_example("basic_example.py")
     
-    trace_file = tmp_path / "examples" / "example_trace.jsonl"
+    trace_file = cwd / "examples" / "example_trace.jsonl"
     assert trace_file.exists(), "Trace file was not created"
     
     # Verify trace file has valid JSON lines
@@ -66,50 +80,34 @@ def test_basic_example_creates_trace_file(examples_dir, tmp_path):
             assert "status" in log_entry
 
 
-def test_basic_example_creates_visualization(examples_dir, tmp_path):
+def test_basic_example_creates_visualization(run_example):
     """Test that basic_example.py creates an HTML visualization."""
     # Run the basic example
-    subprocess.run(
-        [sys.executable, str(examples_dir / "basic_example.py")],
-        cwd=tmp_path,
-        capture_output=True
-    )
+    cwd, _ = run_example("basic_example.py")
     
-    html_file = tmp_path / "examples" / "trace_visualization.html"
+    html_file = cwd / "examples" / "trace_visualization.html"
     assert html_file.exists(), "HTML visualization was not created"
     
     # Verify it's a valid HTML file
-    with open(html_file, "r") as f:
-        content = f.read()
-        assert "<!DOCTYPE html>" in content
-        assert "<html" in content
-        assert "tr-ai-cing" in content
+    content = html_file.read_text(encoding="utf-8")
+    assert "<!DOCTYPE html>" in content
+    assert "<html" in content
+    assert "tr-ai-cing" in content
 
 
-def test_error_handling_example_runs_successfully(examples_dir, tmp_path):
+def test_error_handling_example_runs_successfully(run_example):
     """Test that error_handling_example.py runs without errors."""
-    result = subprocess.run(
-        [sys.executable, str(examples_dir / "error_handling_example.py")],
-        cwd=tmp_path,
-        capture_output=True,
-        text=True
-    )
+    _, stdout = run_example("error_handling_example.py")
     
-    assert result.returncode == 0, f"Script failed with error: {result.stderr}"
-    assert "Tracing LLM calls with errors..." in result.stdout
-    assert "Trace completed!" in result.stdout
+    assert "Tracing LLM calls with errors..." in stdout
+    assert "Trace completed!" in stdout
 
 
-def test_error_handling_example_captures_errors(examples_dir, tmp_path):
+def test_error_handling_example_captures_errors(run_example):
     """Test that error_handling_example.py creates a valid trace file."""
-    result = subprocess.run(
-        [sys.executable, str(examples_dir / "error_handling_example.py")],
-        cwd=tmp_path,
-        capture_output=True,
-        text=True
-    )
+    cwd, stdout = run_example("error_handling_example.py")
     
-    trace_file = tmp_path / "examples" / "error_trace.jsonl"
+    trace_file = cwd / "examples" / "error_trace.jsonl"
     assert trace_file.exists()
     
     # Verify trace file has valid JSON lines and spans
@@ -124,35 +122,25 @@ def test_error_handling_example_captures_errors(examples_dir, tmp_path):
             assert "status" in log_entry
     
     # Verify the output shows error handling
-    assert "Error traced:" in result.stdout or "Successful call traced" in result.stdout
+    assert "Error traced:" in stdout or "Successful call traced" in stdout
 
 
-def test_langgraph_example_runs_successfully(examples_dir, tmp_path):
+def test_langgraph_example_runs_successfully(run_example):
     """Test that langgraph_example.py runs without errors."""
-    result = subprocess.run(
-        [sys.executable, str(examples_dir / "langgraph_example.py")],
-        cwd=tmp_path,
-        capture_output=True,
-        text=True
-    )
+    _, stdout = run_example("langgraph_example.py")
     
-    assert result.returncode == 0, f"Script failed with error: {result.stderr}"
-    assert "Started trace:" in result.stdout
-    assert "Processing: What's the weather like today?" in result.stdout
-    assert "Processing: What is the capital of France?" in result.stdout
-    assert "Processing: Tell me about artificial intelligence" in result.stdout
-    assert "Trace completed!" in result.stdout
+    assert "Started trace:" in stdout
+    assert "Processing: What's the weather like today?" in stdout
+    assert "Processing: What is the capital of France?" in stdout
+    assert "Processing: Tell me about artificial intelligence" in stdout
+    assert "Trace completed!" in stdout
 
 
-def test_langgraph_example_creates_trace_file(examples_dir, tmp_path):
+def test_langgraph_example_creates_trace_file(run_example):
     """Test that langgraph_example.py creates a valid trace file."""
-    subprocess.run(
-        [sys.executable, str(examples_dir / "langgraph_example.py")],
-        cwd=tmp_path,
-        capture_output=True
-    )
+    cwd, _ = run_example("langgraph_example.py")
     
-    trace_file = tmp_path / "examples" / "langgraph_trace.jsonl"
+    trace_file = cwd / "examples" / "langgraph_trace.jsonl"
     assert trace_file.exists(), "Trace file was not created"
     
     # Verify trace file has valid JSON lines
@@ -189,15 +177,11 @@ def test_langgraph_example_creates_trace_file(examples_dir, tmp_path):
         assert len(llm_call_spans) > 0, "No LLM call spans found"
 
 
-def test_langgraph_example_has_correct_hierarchy(examples_dir, tmp_path):
+def test_langgraph_example_has_correct_hierarchy(run_example):
     """Test that langgraph_example.py creates proper parent-child relationships."""
-    subprocess.run(
-        [sys.executable, str(examples_dir / "langgraph_example.py")],
-        cwd=tmp_path,
-        capture_output=True
-    )
+    cwd, _ = run_example("langgraph_example.py")
     
-    trace_file = tmp_path / "examples" / "langgraph_trace.jsonl"
+    trace_file = cwd / "examples" / "langgraph_trace.jsonl"
     
     with open(trace_file, "r") as f:
         spans = [json.loads(line) for line in f]
@@ -227,15 +211,11 @@ def test_langgraph_example_has_correct_hierarchy(examples_dir, tmp_path):
         assert parent["type"] == "agent_node", "LLM call parent should be agent_node"
 
 
-def test_langgraph_example_has_metadata(examples_dir, tmp_path):
+def test_langgraph_example_has_metadata(run_example):
     """Test that langgraph_example.py includes proper metadata."""
-    subprocess.run(
-        [sys.executable, str(examples_dir / "langgraph_example.py")],
-        cwd=tmp_path,
-        capture_output=True
-    )
+    cwd, _ = run_example("langgraph_example.py")
     
-    trace_file = tmp_path / "examples" / "langgraph_trace.jsonl"
+    trace_file = cwd / "examples" / "langgraph_trace.jsonl"
     
     with open(trace_file, "r") as f:
         spans = [json.loads(line) for line in f]
@@ -248,26 +228,21 @@ def test_langgraph_example_has_metadata(examples_dir, tmp_path):
     assert has_node_metadata, "No LLM calls with 'node' metadata found"
 
 
-def test_langgraph_example_creates_visualization(examples_dir, tmp_path):
+def test_langgraph_example_creates_visualization(run_example):
     """Test that langgraph_example.py creates an HTML visualization."""
-    subprocess.run(
-        [sys.executable, str(examples_dir / "langgraph_example.py")],
-        cwd=tmp_path,
-        capture_output=True
-    )
+    cwd, _ = run_example("langgraph_example.py")
     
-    html_file = tmp_path / "examples" / "langgraph_visualization.html"
+    html_file = cwd / "examples" / "langgraph_visualization.html"
     assert html_file.exists(), "HTML visualization was not created"
     
     # Verify it's a valid HTML file with LangGraph-specific content
-    with open(html_file, "r") as f:
-        content = f.read()
-        assert "<!DOCTYPE html>" in content
-        assert "<html" in content
-        assert "tr-ai-cing" in content
+    content = html_file.read_text(encoding="utf-8")
+    assert "<!DOCTYPE html>" in content
+    assert "<html" in content
+    assert "tr-ai-cing" in content
 
 
-def test_all_examples_output_to_correct_location(examples_dir, tmp_path):
+def test_all_examples_output_to_correct_location(run_example):
     """Test that all examples output files to the examples/ directory."""
     # Define example configurations
     EXAMPLE_CONFIGS = [
@@ -278,14 +253,10 @@ def test_all_examples_output_to_correct_location(examples_dir, tmp_path):
     
     for script, trace_file, html_file in EXAMPLE_CONFIGS:
         # Run the example
-        subprocess.run(
-            [sys.executable, str(examples_dir / script)],
-            cwd=tmp_path,
-            capture_output=True
-        )
+        cwd, _ = run_example(script)
         
         # Check that files are in examples/ directory
-        assert (tmp_path / "examples" / trace_file).exists(), \
+        assert (cwd / "examples" / trace_file).exists(), \
             f"{script} did not create {trace_file} in examples/ directory"
-        assert (tmp_path / "examples" / html_file).exists(), \
+        assert (cwd / "examples" / html_file).exists(), \
             f"{script} did not create {html_file} in examples/ directory"
@@ -16,15 +16,34 @@ def temp_log_file(tmp_path):
 
 @pytest.fixture
 def tracer(temp_log_file):
-    """Create a Tracer instance for testing."""
-    return Tracer(log_file=temp_log_file)
+    """Create a Tracer instance for testing, closed when the test ends."""
+    with Tracer(log_file=temp_log_file) as tracer:
+        yield tracer
 
 
 def test_tracer_initialization(temp_log_file):
     """Test that tracer initializes correctly."""
+    with Tracer(log_file=temp_log_file) as tracer:
+        assert tracer.log_file == temp_log_file
+        assert tracer.auto_flush is True
+
+
+def test_tracer_context_manager_closes_log_file(temp_log_file):
+    """Test that leaving a with block or dropping a tracer closes its log file."""
+    import gc
+    
+    with Tracer(log_file=temp_log_file) as tracer:
+        tracer.log_llm_call("call", "input", "output")
+        file = tracer._file
+        assert not file.closed
+    assert file.closed
+    
     tracer = Tracer(log_file=temp_log_file)
-    assert tracer.log_file == temp_log_file
-    assert tracer.auto_flush is True
+    tracer.log_llm_call("call", "input", "output")
+    file = tracer._file
+    del tracer
+    gc.collect()
+    assert file.closed
 
 
 def test_start_trace(tracer):
@@ -151,3 +170,681 @@ def test_auto_trace_initialization(tracer, temp_log_file):
         log_entry = json.loads(f.read())
         assert "trace_id" in log_entry
         assert log_entry["trace_id"] is not None
+
+
+def test_background_writer_flushes_on_end_trace(temp_log_file):
+    """Test that the background writer persists records on end_trace."""
+    tracer = Tracer(log_file=temp_log_file, background=True)
+    tracer.start_trace()
+    
+    for i in range(5):
+        tracer.log_llm_call(f"call_{i}", f"input {i}", f"output {i}")
+    
+    tracer.end_trace()
+    
+    with open(temp_log_file, "r") as f:
+        lines = f.readlines()
+        assert len(lines) == 5
+        assert [json.loads(line)["name"] for line in lines] == [f"call_{i}" for i in range(5)]
+    
+    tracer.close()
+
+
+def test_background_writer_close_stops_thread(temp_log_file):
+    """Test that closing the tracer drains and stops the writer thread."""
+    tracer = Tracer(log_file=temp_log_file, background=True, buffer_bytes=1 << 20)
+    tracer.log_llm_call("buffered_call", "input", "output")
+    writer = tracer._writer
+    
+    tracer.close()
+    
+    assert not writer.is_alive()
+    assert tracer._writer is None
+    with open(temp_log_file, "r") as f:
+        assert json.loads(f.read())["name"] == "buffered_call"
+
+
+def test_background_writer_replaced_when_thread_dies(temp_log_file):
+    """Test that records logged after the writer thread stopped still reach the file."""
+    with Tracer(log_file=temp_log_file, background=True) as tracer:
+        tracer.log_llm_call("before_stop", "input", "output")
+        dead = tracer._writer
+        # Stop the thread behind the tracer's back, as a fork or I/O error would
+        dead.close()
+        
+        tracer.log_llm_call("after_stop", "input", "output")
+        assert tracer._writer is not dead
+        assert tracer._writer.is_alive()
+    
+    with open(temp_log_file, "r") as f:
+        names = [json.loads(line)["name"] for line in f]
+    assert names == ["before_stop", "after_stop"]
+
+
+def test_default_tracer_is_singleton(monkeypatch):
+    """Test that concurrent first calls share one default tracer."""
+    import threading
+    from tracing import tracer as tracer_module
+    
+    monkeypatch.setattr(tracer_module, "_default_tracer", None)
+    
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(tracer_module.get_default_tracer()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+    assert tracer_module.get_default_tracer() is results[0]
+
+
+def test_log_non_json_native_values(tracer, temp_log_file):
+    """Test that values JSON cannot represent natively are logged as strings."""
+    from datetime import date
+    
+    tracer.log_llm_call(
+        name="dated_call",
+        input_data={"as_of": date(2024, 1, 20)},
+        output_data="ok",
+        metadata={1: "non-string key"}
+    )
+    
+    with open(temp_log_file, "r") as f:
+        log_entry = json.loads(f.read())
+        assert log_entry["input"]["as_of"] == "2024-01-20"
+        assert log_entry["metadata"]["1"] == "non-string key"
+
+
+def test_intern_strings(temp_log_file):
+    """Test that repeated strings are written once per trace as intern records."""
+    with Tracer(log_file=temp_log_file, intern_strings=True) as tracer:
+        tracer.start_trace()
+        
+        for _ in range(3):
+            tracer.log_llm_call("classify", "input", "output", model="gpt-4", provider="openai")
+    
+    with open(temp_log_file, "r") as f:
+        entries = [json.loads(line) for line in f]
+    
+    interns = {e["_tracer_intern"]: e["value"] for e in entries if "_tracer_intern" in e}
+    spans = [e for e in entries if "span_id" in e]
+    
+    assert sorted(interns.values()) == ["classify", "gpt-4", "llm_call", "openai"]
+    assert len(spans) == 3
+    for span in spans:
+        assert interns[span["name"]] == "classify"
+        assert interns[span["model"]] == "gpt-4"
+
+
+def test_unsupported_format(temp_log_file):
+    """Test that an unknown log format is rejected."""
+    with pytest.raises(ValueError):
+        Tracer(log_file=temp_log_file, format="xml")
+
+
+def test_parquet_format_round_trip(tmp_path):
+    """Test that Parquet logs load back into the same span shape as JSONL."""
+    pytest.importorskip("pyarrow")
+    from tracing import Visualizer
+    
+    log_file = tmp_path / "trace.parquet"
+    tracer = Tracer(log_file=log_file)
+    assert tracer.format == "parquet"
+    
+    tracer.start_trace(trace_id="parquet-trace")
+    with tracer.span("parent", metadata={"user": "alice"}) as span:
+        span["data"] = {"k": [1, 2]}
+        tracer.log_llm_call("child", {"prompt": "hi"}, "hello", model="gpt-4")
+    tracer.end_trace()
+    tracer.close()
+    
+    visualizer = Visualizer(log_file=log_file)
+    visualizer.load_traces()
+    
+    child, parent = visualizer.traces["parquet-trace"]
+    assert child["name"] == "child"
+    assert child["input"] == {"prompt": "hi"}
+    assert child["model"] == "gpt-4"
+    assert "provider" not in child
+    assert child["parent_span_id"] == parent["span_id"]
+    assert parent["parent_span_id"] is None
+    assert parent["metadata"] == {"user": "alice"}
+    assert parent["data"] == {"k": [1, 2]}
+    
+    from tracing.parquet import read_parquet_spans
+    
+    headers = read_parquet_spans(log_file, columns=["span_id", "name", "parent_span_id"])
+    assert headers == [
+        {"span_id": child["span_id"], "name": "child", "parent_span_id": parent["span_id"]},
+        {"span_id": parent["span_id"], "name": "parent", "parent_span_id": None},
+    ]
+
+
+def test_parquet_row_groups_span_traces(tmp_path):
+    """Test that ending traces does not cut a Parquet row group per trace."""
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    
+    log_file = tmp_path / "trace.parquet"
+    tracer = Tracer(log_file=log_file)
+    for i in range(20):
+        tracer.start_trace()
+        tracer.log_llm_call(f"call_{i}", "input", "output")
+        tracer.end_trace()
+    tracer.flush()
+    tracer.close()
+    
+    metadata = pq.ParquetFile(log_file).metadata
+    assert metadata.num_row_groups == 1
+    assert metadata.num_rows == 20
+
+
+def test_parquet_log_after_close_raises(tmp_path):
+    """Test that logging to a closed Parquet tracer fails clearly and keeps the file."""
+    pytest.importorskip("pyarrow")
+    from tracing.parquet import read_parquet_spans
+    
+    log_file = tmp_path / "trace.parquet"
+    tracer = Tracer(log_file=log_file)
+    tracer.log_llm_call("before_close", "input", "output")
+    tracer.close()
+    
+    with pytest.raises(ValueError, match="already closed"):
+        tracer.log_llm_call("after_close", "input", "output")
+    tracer.end_trace()
+    tracer.close()
+    
+    assert [s["name"] for s in read_parquet_spans(log_file)] == ["before_close"]
+
+
+def test_parquet_spans_written_when_tracer_is_dropped(tmp_path):
+    """Test that an unclosed Parquet tracer writes its buffered spans when collected."""
+    pytest.importorskip("pyarrow")
+    import gc
+    from tracing.parquet import read_parquet_spans
+    
+    log_file = tmp_path / "trace.parquet"
+    
+    def log_and_drop():
+        tracer = Tracer(log_file=log_file)
+        tracer.log_llm_call("unclosed", "input", "output")
+    
+    log_and_drop()
+    gc.collect()
+    
+    assert [s["name"] for s in read_parquet_spans(log_file)] == ["unclosed"]
+
+
+def test_parquet_writer_buffers_full_row_groups(tmp_path):
+    """Test that the Parquet writer only writes row_group_size spans at a time."""
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from tracing.parquet import ParquetSpanWriter, read_parquet_spans
+    
+    log_file = tmp_path / "spans.parquet"
+    writer = ParquetSpanWriter(log_file, row_group_size=8)
+    for i in range(20):
+        writer.write({"span_id": str(i), "name": "call", "duration_ms": 1.0})
+    writer.close()
+    
+    metadata = pq.ParquetFile(log_file).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [8, 8, 4]
+    assert [s["span_id"] for s in read_parquet_spans(log_file)] == [str(i) for i in range(20)]
+
+
+def test_disabled_tracer_records_nothing(temp_log_file):
+    """Test that a disabled tracer hands out no-op spans and writes nothing."""
+    with Tracer(log_file=temp_log_file, enabled=False) as tracer:
+        with tracer.span("ignored") as span:
+            span["input"] = "still assignable"
+            with tracer.span("nested_ignored"):
+                pass
+        tracer.log_llm_call("ignored_call", "input", "output")
+        
+        assert tracer.span("a") is tracer.span("b")
+        assert len(tracer._span_stack) == 0
+    assert not temp_log_file.exists()
+
+
+def test_concurrent_tasks_keep_separate_span_stacks(tracer, temp_log_file):
+    """Test that interleaved asyncio tasks each nest spans under their own parent."""
+    import asyncio
+    
+    async def workflow(name):
+        with tracer.span(name, span_type="workflow"):
+            await asyncio.sleep(0)
+            with tracer.span(f"{name}_child"):
+                await asyncio.sleep(0)
+    
+    async def main():
+        await asyncio.gather(workflow("a"), workflow("b"))
+    
+    tracer.start_trace()
+    asyncio.run(main())
+    
+    with open(temp_log_file, "r") as f:
+        spans = {span["name"]: span for span in map(json.loads, f)}
+    
+    assert spans["a_child"]["parent_span_id"] == spans["a"]["span_id"]
+    assert spans["b_child"]["parent_span_id"] == spans["b"]["span_id"]
+    assert spans["a"]["parent_span_id"] is None
+    assert spans["b"]["parent_span_id"] is None
+
+
+def test_tracers_per_request_do_not_grow_the_context(tmp_path):
+    """Test that creating and closing many tracers leaves the context bounded."""
+    import contextvars
+    
+    def handle_requests():
+        for i in range(100):
+            with Tracer(log_file=tmp_path / "trace.jsonl") as tracer:
+                tracer.start_trace()
+                with tracer.span(f"request_{i}"):
+                    pass
+                tracer.end_trace()
+        return len(contextvars.copy_context())
+    
+    assert contextvars.copy_context().run(handle_requests) <= len(contextvars.copy_context()) + 1
+
+
+def test_executor_preserves_parent_span(tracer, temp_log_file):
+    """Test that spans opened on executor threads nest under the submitting span."""
+    def work(i):
+        tracer.log_llm_call(f"worker_call_{i}", "input", "output")
+    
+    with tracer.span("fan_out", span_type="workflow") as parent:
+        with tracer.executor(max_workers=2) as executor:
+            list(executor.map(work, range(4)))
+        parent_id = parent["span_id"]
+    
+    with open(temp_log_file, "r") as f:
+        spans = [json.loads(line) for line in f]
+    
+    workers = [s for s in spans if s["name"].startswith("worker_call_")]
+    assert len(workers) == 4
+    assert all(s["parent_span_id"] == parent_id for s in workers)
+
+
+def test_log_llm_call_many(tracer, temp_log_file):
+    """Test logging a batch of LLM calls as siblings under the open span."""
+    with tracer.span("batch", span_type="workflow") as parent:
+        tracer.log_llm_call_many([
+            {"name": "call_1", "input_data": "in 1", "output_data": "out 1", "model": "gpt-4"},
+            {"name": "call_2", "input_data": "in 2", "output_data": "out 2", "metadata": {"k": "v"}},
+        ])
+    
+    with open(temp_log_file, "r") as f:
+        call_1, call_2, batch = [json.loads(line) for line in f]
+    
+    assert batch["span_id"] == parent["span_id"]
+    assert call_1["name"] == "call_1"
+    assert call_1["model"] == "gpt-4"
+    assert call_2["metadata"] == {"k": "v"}
+    assert "model" not in call_2
+    for call in (call_1, call_2):
+        assert call["type"] == "llm_call"
+        assert call["status"] == "success"
+        assert call["parent_span_id"] == batch["span_id"]
+        assert call["trace_id"] == batch["trace_id"]
+
+
+def test_background_tracers_share_writer(temp_log_file):
+    """Test that tracers logging to the same file share one writer thread."""
+    first = Tracer(log_file=temp_log_file, background=True)
+    second = Tracer(log_file=temp_log_file, background=True)
+    
+    first.log_llm_call("first_call", "input", "output")
+    second.log_llm_call("second_call", "input", "output")
+    writer = first._writer
+    assert second._writer is writer
+    
+    first.close()
+    assert writer.is_alive()
+    second.log_llm_call("after_first_closed", "input", "output")
+    second.close()
+    assert not writer.is_alive()
+    
+    with open(temp_log_file, "r") as f:
+        names = sorted(json.loads(line)["name"] for line in f)
+    assert names == ["after_first_closed", "first_call", "second_call"]
+
+
+def test_background_writer_writes_partial_batch_after_interval(temp_log_file):
+    """Test that a partly filled buffer is written without an explicit flush."""
+    import time
+    
+    tracer = Tracer(log_file=temp_log_file, background=True, buffer_bytes=1 << 20)
+    tracer.log_llm_call("quiet_call", "input", "output")
+    
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if temp_log_file.exists() and temp_log_file.stat().st_size > 0:
+            break
+        time.sleep(0.01)
+    
+    with open(temp_log_file, "r") as f:
+        assert json.loads(f.read())["name"] == "quiet_call"
+    tracer.close()
+
+
+def test_span_and_trace_ids_are_unique(temp_log_file):
+    """Test that generated span and trace ids never repeat."""
+    with Tracer(log_file=temp_log_file) as tracer:
+        trace_ids = {tracer.start_trace() for _ in range(100)}
+        assert len(trace_ids) == 100
+        
+        for i in range(100):
+            tracer.log_llm_call(f"call_{i}", "input", "output")
+    
+    with open(temp_log_file, "r") as f:
+        span_ids = {json.loads(line)["span_id"] for line in f}
+    assert len(span_ids) == 100
+    assert not span_ids & trace_ids
+
+
+def test_cached_llm_call_skips_repeated_calls(temp_log_file):
+    """Test that an identical cached call is served without calling the LLM."""
+    from tracing import LLMCache
+    
+    with Tracer(log_file=temp_log_file) as tracer:
+        cache = LLMCache()
+        calls = []
+        
+        def call(prompt):
+            calls.append(prompt)
+            return f"answer to {prompt}"
+        
+        first = tracer.cached_llm_call("ask", "hello", call, cache, model="gpt-4")
+        second = tracer.cached_llm_call("ask", "hello", call, cache, model="gpt-4")
+        other_model = tracer.cached_llm_call("ask", "hello", call, cache, model="gpt-3.5")
+    
+    assert first == second == other_model == "answer to hello"
+    assert len(calls) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+    
+    with open(temp_log_file, "r") as f:
+        statuses = [json.loads(line)["metadata"]["cache"] for line in f]
+    assert statuses == ["miss", "hit", "miss"]
+
+
+def test_llm_cache_evicts_least_recently_used():
+    """Test that the cache keeps at most maxsize responses."""
+    from tracing import LLMCache
+    
+    cache = LLMCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_semantic_cache_matches_similar_prompts(tmp_path):
+    """Test that the semantic cache reuses responses to similar prompts."""
+    pytest.importorskip("numpy")
+    from tracing import SemanticCache
+    
+    vocabulary = ["weather", "today", "sunny", "like", "stock", "price"]
+    
+    def embed(text):
+        words = text.lower().replace("?", "").split()
+        return [float(word in words) for word in vocabulary]
+    
+    cache = SemanticCache(embed, threshold=0.7)
+    cache.set(cache.key(None, "What's the weather like today?"), "Sunny")
+    
+    assert cache.get("Weather today?") == "Sunny"
+    assert cache.get("Stock price today?") is None
+    
+    cache.save(tmp_path / "cache")
+    restored = SemanticCache(embed, threshold=0.7)
+    restored.load(tmp_path / "cache")
+    assert len(restored) == 1
+    assert restored.get("Weather today?") == "Sunny"
+
+
+def test_semantic_cache_rejects_empty_maxsize():
+    """Test that a semantic cache that could hold nothing is rejected."""
+    pytest.importorskip("numpy")
+    from tracing import SemanticCache
+    
+    with pytest.raises(ValueError, match="maxsize"):
+        SemanticCache(lambda text: [1.0], maxsize=0)
+
+
+def test_async_tracer_writes_from_event_loop(temp_log_file):
+    """Test that the async tracer queues records and writes them on aflush."""
+    import asyncio
+    from tracing import AsyncTracer
+    
+    tracer = AsyncTracer(log_file=temp_log_file)
+    
+    async def workflow(name):
+        with tracer.span(name, span_type="workflow"):
+            await asyncio.sleep(0)
+            tracer.log_llm_call(f"{name}_call", "input", "output")
+    
+    async def main():
+        await asyncio.gather(workflow("first"), workflow("second"))
+        await tracer.aclose()
+    
+    asyncio.run(main())
+    
+    with open(temp_log_file, "r") as f:
+        spans = {s["name"]: s for s in (json.loads(line) for line in f)}
+    assert set(spans) == {"first", "second", "first_call", "second_call"}
+    assert spans["first_call"]["parent_span_id"] == spans["first"]["span_id"]
+    assert spans["second_call"]["parent_span_id"] == spans["second"]["span_id"]
+    
+    # Outside an event loop records are written straight away
+    tracer.log_llm_call("sync_call", "input", "output")
+    with open(temp_log_file, "r") as f:
+        assert json.loads(f.readlines()[-1])["name"] == "sync_call"
+
+
+def test_bounded_background_queue_counts_dropped_records(temp_log_file):
+    """Test that a full background queue drops records and reports the count."""
+    from tracing import Visualizer
+    from tracing.writer import _WriterThread
+    
+    # A writer that is never started, so nothing leaves its queue
+    writer = _WriterThread(temp_log_file, max_queue_size=2, on_overflow="drop_newest")
+    for i in range(5):
+        writer.put(f"{i}\n".encode())
+    assert writer.dropped == 3
+    assert writer._queue.qsize() == 2
+    writer.close()
+    
+    # drop_oldest keeps the newest records
+    writer = _WriterThread(temp_log_file, max_queue_size=2, on_overflow="drop_oldest")
+    for i in range(5):
+        writer.put(f"{i}\n".encode())
+    assert writer.dropped == 3
+    assert list(writer._queue.queue) == [b"3\n", b"4\n"]
+    writer.close()
+    
+    tracer = Tracer(
+        log_file=temp_log_file, background=True,
+        max_queue_size=1, on_overflow="drop_oldest"
+    )
+    for i in range(200):
+        tracer.log_llm_call(f"call_{i}", "input", "output")
+    dropped = tracer.dropped_records
+    tracer.close()
+    
+    visualizer = Visualizer(temp_log_file)
+    visualizer.load_traces()
+    assert len(visualizer.spans) + visualizer.dropped_spans == 200
+    assert visualizer.dropped_spans == dropped
+
+
+def test_unsupported_overflow_policy_raises(temp_log_file):
+    """Test that an unknown overflow policy is rejected."""
+    with pytest.raises(ValueError):
+        Tracer(log_file=temp_log_file, on_overflow="panic")
+
+
+def test_sample_rate_records_a_fraction_of_traces(temp_log_file):
+    """Test that sampling decides per trace and keeps whole traces."""
+    with Tracer(log_file=temp_log_file, sample_rate=0.25) as tracer:
+        for _ in range(400):
+            tracer.start_trace()
+            with tracer.span("workflow", span_type="workflow"):
+                tracer.log_llm_call("call", "input", "output")
+            tracer.end_trace()
+    
+    with open(temp_log_file, "r") as f:
+        spans = [json.loads(line) for line in f]
+    traces = {}
+    for span in spans:
+        traces.setdefault(span["trace_id"], []).append(span)
+    
+    assert 50 < len(traces) < 150
+    assert all(len(trace_spans) == 2 for trace_spans in traces.values())
+
+
+def test_keep_errors_records_unsampled_failed_traces(temp_log_file):
+    """Test that keep_errors records every span of a trace that errors."""
+    with Tracer(log_file=temp_log_file, sample_rate=0.0, keep_errors=True) as tracer:
+        tracer.start_trace()
+        with tracer.span("quiet_workflow", span_type="workflow"):
+            tracer.log_llm_call("quiet_call", "input", "output")
+        tracer.end_trace()
+        
+        tracer.start_trace()
+        with pytest.raises(ValueError):
+            with tracer.span("failing_workflow", span_type="workflow"):
+                tracer.log_llm_call("before_failure", "input", "output")
+                with tracer.span("failing_step"):
+                    raise ValueError("boom")
+        tracer.end_trace()
+    
+    with open(temp_log_file, "r") as f:
+        names = [json.loads(line)["name"] for line in f]
+    assert names == ["before_failure", "failing_step", "failing_workflow"]
+
+
+def test_shard_by_pid_writes_one_file_per_process(temp_log_file, monkeypatch):
+    """Test that sharded tracers write per-process files the visualizer merges."""
+    import os
+    from tracing import Visualizer
+    
+    with Tracer(log_file=temp_log_file, shard_by_pid=True) as tracer:
+        tracer.log_llm_call("parent_call", "input", "output")
+        
+        # Simulate the first write after a fork
+        monkeypatch.setattr(os, "getpid", lambda: 99999)
+        tracer.log_llm_call("child_call", "input", "output")
+    monkeypatch.undo()
+    
+    assert not temp_log_file.exists()
+    parent_shard = temp_log_file.with_name(f"test_trace.pid{os.getpid()}.jsonl")
+    child_shard = temp_log_file.with_name("test_trace.pid99999.jsonl")
+    assert parent_shard.exists() and child_shard.exists()
+    
+    visualizer = Visualizer(temp_log_file)
+    visualizer.load_traces()
+    assert [s["name"] for s in visualizer.spans] == ["parent_call", "child_call"]
+
+
+def test_sync_writes_reopen_rotated_log_file(temp_log_file):
+    """Test that the cached log file handle follows a rotated log file."""
+    from tracing.tracer import _REOPEN_CHECK_INTERVAL
+    
+    tracer = Tracer(log_file=temp_log_file)
+    tracer.log_llm_call("before_rotation", "input", "output")
+    temp_log_file.rename(temp_log_file.with_suffix(".1"))
+    
+    for i in range(_REOPEN_CHECK_INTERVAL):
+        tracer.log_llm_call(f"after_rotation_{i}", "input", "output")
+    tracer.close()
+    
+    with open(temp_log_file, "r") as f:
+        names = [json.loads(line)["name"] for line in f]
+    assert names[-1] == f"after_rotation_{_REOPEN_CHECK_INTERVAL - 1}"
+
+
+@pytest.mark.parametrize("codec", ["zlib", "zstd"])
+def test_payload_compression_round_trip(temp_log_file, codec):
+    """Test that large payloads are compressed, deduplicated and restored on load."""
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    from tracing import Visualizer
+    
+    prompt = "Summarize this document: " + "lorem ipsum " * 500
+    with Tracer(log_file=temp_log_file, payload_compression=codec) as tracer:
+        tracer.start_trace()
+        tracer.log_llm_call("first", prompt, "short answer")
+        tracer.log_llm_call("second", prompt, "another answer")
+        tracer.end_trace()
+    
+    with open(temp_log_file, "r") as f:
+        first, second = (json.loads(line) for line in f)
+    assert set(first["input"]) == {"_tracer_payload", f"_{codec}_b64"}
+    assert second["input"] == {"_tracer_payload": first["input"]["_tracer_payload"]}
+    assert first["output"] == "short answer"
+    assert temp_log_file.stat().st_size < len(prompt)
+    
+    visualizer = Visualizer(temp_log_file)
+    visualizer.load_traces()
+    assert [s["input"] for s in visualizer.spans] == [prompt, prompt]
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_compressed_log_round_trip(tmp_path, background):
+    """Test that .zst logs are written as zstd frames and load transparently."""
+    pytest.importorskip("zstandard")
+    from tracing import Visualizer
+    
+    log_file = tmp_path / "trace.jsonl.zst"
+    # Two tracers appending in turn, as separate runs of a program would
+    for run in range(2):
+        tracer = Tracer(log_file=log_file, background=background)
+        tracer.start_trace(trace_id=f"trace-{run}")
+        with tracer.span("parent"):
+            tracer.log_llm_call("call", "input " * 100, "output")
+        tracer.end_trace()
+        tracer.close()
+    
+    assert log_file.read_bytes()[:4] == b"\x28\xb5\x2f\xfd"
+    
+    visualizer = Visualizer(log_file)
+    visualizer.load_traces()
+    assert list(visualizer.traces) == ["trace-0", "trace-1"]
+    assert [s["name"] for s in visualizer.spans] == ["call", "parent"] * 2
+
+
+def test_compressed_log_shares_context_across_flushes(tmp_path):
+    """Test that per-record flushes of a .zst log do not each start a new frame."""
+    zstandard = pytest.importorskip("zstandard")
+    
+    log_file = tmp_path / "trace.jsonl.zst"
+    tracer = Tracer(log_file=log_file)
+    tracer.start_trace()
+    for i in range(200):
+        tracer.log_llm_call(f"call_{i % 5}", "What is the capital of France?", "Paris", model="gpt-4")
+    tracer.end_trace()
+    tracer.close()
+    
+    compressed = log_file.read_bytes()
+    with zstandard.ZstdDecompressor().stream_reader(compressed, read_across_frames=True) as reader:
+        raw = reader.read()
+    assert raw.count(b"\n") == 200
+    # One frame for the tracer's whole lifetime
+    assert compressed.count(b"\x28\xb5\x2f\xfd") == 1
+    assert len(raw) > 8 * len(compressed)
+
+
+def test_unsupported_payload_compression_raises(temp_log_file):
+    """Test that an unknown payload codec is rejected."""
+    with pytest.raises(ValueError):
+        Tracer(log_file=temp_log_file, payload_compression="lz4")
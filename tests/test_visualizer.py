@@ -4,38 +4,53 @@ Tests for the Visualizer class.
 
 import json
 import pytest
+import re
 from pathlib import Path
 from tracing import Tracer, Visualizer
 
 
-@pytest.fixture
-def temp_log_file(tmp_path):
-    """Create a temporary log file with test data."""
-    log_file = tmp_path / "test_trace.jsonl"
+@pytest.fixture(scope="module")
+def temp_log_file(tmp_path_factory):
+    """Create a temporary log file with test data, shared by the module's tests."""
+    log_file = tmp_path_factory.mktemp("logs") / "test_trace.jsonl"
     
     # Create sample trace data
-    tracer = Tracer(log_file=log_file)
-    tracer.start_trace(trace_id="test-trace-123")
-    
-    with tracer.span("parent_span", metadata={"test": "metadata"}):
-        tracer.log_llm_call(
-            name="test_llm_call",
-            input_data="What is Python?",
-            output_data="Python is a programming language",
-            model="gpt-4",
-            provider="openai"
-        )
-    
-    tracer.end_trace()
+    with Tracer(log_file=log_file) as tracer:
+        tracer.start_trace(trace_id="test-trace-123")
+        
+        with tracer.span("parent_span", metadata={"test": "metadata"}):
+            tracer.log_llm_call(
+                name="test_llm_call",
+                input_data="What is Python?",
+                output_data="Python is a programming language",
+                model="gpt-4",
+                provider="openai"
+            )
+        
+        tracer.end_trace()
     return log_file
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def visualizer(temp_log_file):
-    """Create a Visualizer instance for testing."""
+    """
+    Create a Visualizer instance for testing.
+    
+    Shared by the module's tests: the log is only read, and the instance
+    parses it once, on the first load_traces() or generate_html() call;
+    later calls find the log unchanged and skip parsing.
+    """
     return Visualizer(log_file=temp_log_file)
 
 
+@pytest.fixture(scope="module")
+def generated_html(visualizer, tmp_path_factory):
+    """Generate the sample trace's HTML once and return its content."""
+    output_file = tmp_path_factory.mktemp("html") / "test_output.html"
+    visualizer.generate_html(output_file)
+    return output_file.read_text(encoding="utf-8")
+
+
 def test_visualizer_initialization(temp_log_file):
     """Test that visualizer initializes correctly."""
     visualizer = Visualizer(log_file=temp_log_file)
@@ -53,6 +68,48 @@ def test_load_traces(visualizer):
     assert "test-trace-123" in visualizer.traces
 
 
+def test_columns(visualizer):
+    """Test the columnar view of the loaded spans."""
+    visualizer.load_traces()
+    columns = visualizer.columns
+    
+    assert columns["span_id"] == [span["span_id"] for span in visualizer.spans]
+    assert columns["status"] == ["success", "success"]
+    assert columns["parent_span_id"].count(None) == 1
+    assert list(columns["duration_ms"]) == [span["duration_ms"] for span in visualizer.spans]
+    
+    # Reloading an unchanged log keeps the loaded state
+    visualizer.load_traces()
+    assert visualizer.columns is columns
+
+
+def test_load_traces_reparses_only_changed_logs(tmp_path):
+    """Test that load_traces() skips parsing until the log changes."""
+    log_file = tmp_path / "changing.jsonl"
+    with Tracer(log_file=log_file) as tracer:
+        tracer.start_trace(trace_id="trace-1")
+        tracer.log_llm_call("call1", "input1", "output1")
+        tracer.end_trace()
+        
+        visualizer = Visualizer(log_file=log_file)
+        visualizer.load_traces()
+        spans = visualizer.spans
+        visualizer.load_traces()
+        assert visualizer.spans is spans
+        
+        tracer.start_trace(trace_id="trace-2")
+        tracer.log_llm_call("call2", "input2", "output2")
+        tracer.end_trace()
+    
+    visualizer.load_traces()
+    assert [s["name"] for s in visualizer.spans] == ["call1", "call2"]
+    assert list(visualizer.traces) == ["trace-1", "trace-2"]
+    
+    log_file.unlink()
+    visualizer.load_traces()
+    assert visualizer.spans == []
+
+
 def test_load_traces_empty_file(tmp_path):
     """Test loading from an empty log file."""
     empty_file = tmp_path / "empty.jsonl"
@@ -76,6 +133,19 @@ def test_load_traces_nonexistent_file(tmp_path):
     assert visualizer.traces == {}
 
 
+def test_load_traces_ignores_unsharded_sibling_logs(tmp_path):
+    """Test that numbered sibling logs are not mistaken for per-process shards."""
+    log_file = tmp_path / "traces.jsonl"
+    for name in ("traces.jsonl", "traces.2024.jsonl", "traces.1.jsonl"):
+        with Tracer(log_file=tmp_path / name) as tracer:
+            tracer.log_llm_call(name, "input", "output")
+    
+    visualizer = Visualizer(log_file=log_file)
+    visualizer.load_traces()
+    
+    assert [s["name"] for s in visualizer.spans] == ["traces.jsonl"]
+
+
 def test_generate_html(visualizer, tmp_path):
     """Test generating HTML visualization."""
     output_file = tmp_path / "test_output.html"
@@ -85,76 +155,58 @@ def test_generate_html(visualizer, tmp_path):
     assert result == output_file
     
     # Verify HTML content
-    with open(output_file, "r") as f:
-        content = f.read()
-        assert "<!DOCTYPE html>" in content
-        assert "tr-ai-cing" in content
-        assert "Trace Visualization" in content
+    content = output_file.read_text(encoding="utf-8")
+    assert "<!DOCTYPE html>" in content
+    assert "tr-ai-cing" in content
+    assert "Trace Visualization" in content
 
 
-def test_html_contains_trace_data(visualizer, tmp_path):
+def test_html_contains_trace_data(generated_html):
     """Test that generated HTML contains trace data."""
-    output_file = tmp_path / "test_output.html"
-    visualizer.generate_html(output_file)
-    
-    with open(output_file, "r") as f:
-        content = f.read()
-        # Check for trace ID prefix (since it's truncated in display)
-        assert "test-trace" in content or "test_llm_call" in content or "parent_span" in content
+    # Check for trace ID prefix (since it's truncated in display)
+    assert (
+        "test-trace" in generated_html
+        or "test_llm_call" in generated_html
+        or "parent_span" in generated_html
+    )
 
 
-def test_html_has_proper_structure(visualizer, tmp_path):
+def test_html_has_proper_structure(generated_html):
     """Test that generated HTML has proper structure."""
-    output_file = tmp_path / "test_output.html"
-    visualizer.generate_html(output_file)
-    
-    with open(output_file, "r") as f:
-        content = f.read()
-        # Check for essential HTML elements
-        assert "<html" in content
-        assert "<head>" in content
-        assert "<body>" in content
-        assert "<style>" in content
-        assert "<script>" in content
-        assert "</html>" in content
+    # Check for essential HTML elements
+    assert "<html" in generated_html
+    assert "<head>" in generated_html
+    assert "<body>" in generated_html
+    assert "<style>" in generated_html
+    assert "<script>" in generated_html
+    assert "</html>" in generated_html
 
 
-def test_html_includes_css(visualizer, tmp_path):
+def test_html_includes_css(generated_html):
     """Test that generated HTML includes CSS styling."""
-    output_file = tmp_path / "test_output.html"
-    visualizer.generate_html(output_file)
-    
-    with open(output_file, "r") as f:
-        content = f.read()
-        assert ".container" in content
-        assert ".trace-container" in content
-        assert ".span-node" in content
+    assert ".container" in generated_html
+    assert ".trace-container" in generated_html
+    assert ".span-node" in generated_html
 
 
-def test_html_includes_javascript(visualizer, tmp_path):
+def test_html_includes_javascript(generated_html):
     """Test that generated HTML includes JavaScript."""
-    output_file = tmp_path / "test_output.html"
-    visualizer.generate_html(output_file)
-    
-    with open(output_file, "r") as f:
-        content = f.read()
-        assert "function toggleSpan" in content
+    assert "function toggleSpan" in generated_html
 
 
 def test_multiple_traces(tmp_path):
     """Test visualizing multiple traces."""
     log_file = tmp_path / "multi_trace.jsonl"
-    tracer = Tracer(log_file=log_file)
-    
-    # Create first trace
-    tracer.start_trace(trace_id="trace-1")
-    tracer.log_llm_call("call1", "input1", "output1")
-    tracer.end_trace()
-    
-    # Create second trace
-    tracer.start_trace(trace_id="trace-2")
-    tracer.log_llm_call("call2", "input2", "output2")
-    tracer.end_trace()
+    with Tracer(log_file=log_file) as tracer:
+        # Create first trace
+        tracer.start_trace(trace_id="trace-1")
+        tracer.log_llm_call("call1", "input1", "output1")
+        tracer.end_trace()
+        
+        # Create second trace
+        tracer.start_trace(trace_id="trace-2")
+        tracer.log_llm_call("call2", "input2", "output2")
+        tracer.end_trace()
     
     # Visualize
     visualizer = Visualizer(log_file=log_file)
@@ -163,3 +215,161 @@ def test_multiple_traces(tmp_path):
     assert len(visualizer.traces) == 2
     assert "trace-1" in visualizer.traces
     assert "trace-2" in visualizer.traces
+
+
+def test_load_traces_keeps_user_spans_named_like_drop_reports(tmp_path):
+    """Test that a user span of type "tracer_drop" is loaded as a normal span."""
+    log_file = tmp_path / "drop_type.jsonl"
+    with Tracer(log_file=log_file) as tracer:
+        with tracer.span("custom", span_type="tracer_drop"):
+            pass
+    
+    visualizer = Visualizer(log_file=log_file)
+    visualizer.load_traces()
+    
+    assert [s["type"] for s in visualizer.spans] == ["tracer_drop"]
+    assert visualizer.dropped_spans == 0
+
+
+def test_load_traces_keeps_user_dicts_with_ref_keys(tmp_path):
+    """Test that user inputs with a "_ref" key are not taken for packed payloads."""
+    log_file = tmp_path / "ref_input.jsonl"
+    user_input = {"_ref": "doc-1", "text": "hi"}
+    with Tracer(log_file=log_file) as tracer:
+        tracer.log_llm_call("call", user_input, "out")
+    
+    visualizer = Visualizer(log_file=log_file)
+    visualizer.load_traces()
+    
+    assert visualizer.spans[0]["input"] == user_input
+
+
+def test_load_traces_resolves_interned_strings(tmp_path):
+    """Test that interned span fields are resolved back to strings on load."""
+    log_file = tmp_path / "interned.jsonl"
+    with Tracer(log_file=log_file, intern_strings=True) as tracer:
+        tracer.start_trace(trace_id="trace-1")
+        tracer.log_llm_call("call", "input1", "output1", model="gpt-4")
+        tracer.end_trace()
+        
+        tracer.start_trace(trace_id="trace-2")
+        tracer.log_llm_call("other_call", "input2", "output2", model="gpt-4")
+        tracer.end_trace()
+    
+    visualizer = Visualizer(log_file=log_file)
+    visualizer.load_traces()
+    
+    assert len(visualizer.spans) == 2
+    assert visualizer.traces["trace-1"][0]["name"] == "call"
+    assert visualizer.traces["trace-2"][0]["name"] == "other_call"
+    assert all(span["model"] == "gpt-4" for span in visualizer.spans)
+
+
+def test_load_traces_keeps_user_spans_with_intern_id_fields(tmp_path):
+    """Test that a span with its own "intern_id" field is not taken for an intern record."""
+    log_file = tmp_path / "intern_field.jsonl"
+    span = {
+        "span_id": "span-1", "trace_id": "trace-1", "parent_span_id": None,
+        "name": "call", "type": "llm_call", "status": "success",
+        "start_time": "2024-01-01T00:00:00", "intern_id": 7,
+    }
+    log_file.write_text(json.dumps(span) + "\n")
+    
+    visualizer = Visualizer(log_file=log_file)
+    visualizer.load_traces()
+    
+    assert visualizer.spans == [span]
+
+
+def test_generate_html_deeply_nested_trace(tmp_path):
+    """Test rendering a span chain deeper than the recursion limit."""
+    import sys
+    
+    log_file = tmp_path / "deep.jsonl"
+    depth = sys.getrecursionlimit() + 100
+    with open(log_file, "w") as f:
+        parent = None
+        for i in range(depth):
+            f.write(json.dumps({
+                "span_id": f"span-{i}",
+                "trace_id": "deep-trace",
+                "parent_span_id": parent,
+                "name": f"step_{i}",
+                "status": "success",
+            }) + "\n")
+            parent = f"span-{i}"
+    
+    visualizer = Visualizer(log_file=log_file)
+    visualizer.load_traces()
+    content = visualizer._generate_html_content()
+    
+    assert content.index("step_0<") < content.index("step_1<") < content.index(f"step_{depth - 1}<")
+    assert f"margin-left: {(depth - 1) * 40}px" in content
+
+
+def test_generate_html_escapes_span_fields(tmp_path):
+    """Test that span text is HTML-escaped rather than injected as markup."""
+    log_file = tmp_path / "escape.jsonl"
+    with Tracer(log_file=log_file) as tracer:
+        tracer.start_trace(trace_id="escape-trace")
+        tracer.log_llm_call(
+            "<script>alert('name')</script>",
+            "Is 1 < 2 & 3 > 2?",
+            {"html": "<b>bold</b>"},
+            model="<i>model</i>"
+        )
+        tracer.end_trace()
+    
+    visualizer = Visualizer(log_file=log_file)
+    visualizer.load_traces()
+    content = visualizer._generate_html_content()
+    
+    assert "<script>alert" not in content
+    assert "&lt;script&gt;alert(&#x27;name&#x27;)&lt;/script&gt;" in content
+    # Details are embedded as JSON with "<" escaped, so nothing can close
+    # the script element early
+    assert "Is 1 \\u003c 2 & 3 > 2?" in content
+    assert "\\u003cb>bold\\u003c/b>" in content
+    assert "<i>model</i>" not in content
+    assert "</b>" not in content
+
+
+def test_html_embeds_span_details_per_trace(visualizer):
+    """Test that each trace embeds its spans' details as one JSON array."""
+    visualizer.load_traces()
+    content = visualizer._generate_html_content()
+    
+    blob = re.search(
+        r'<script type="application/json" class="trace-data">(.*?)</script>', content
+    ).group(1)
+    details = json.loads(blob)
+    indexes = [int(i) for i in re.findall(r'data-index="(\d+)"', content)]
+    
+    assert indexes == list(range(len(details))) == [0, 1]
+    assert [d["span_id"] for d in details] == [
+        visualizer.spans[1]["span_id"], visualizer.spans[0]["span_id"]
+    ]
+    assert details[1]["input"] == "What is Python?"
+
+
+def test_generate_chrome_trace(visualizer, tmp_path):
+    """Test exporting traces as Chrome trace events."""
+    output_file = visualizer.generate_chrome_trace(tmp_path / "trace_events.json")
+    
+    with open(output_file, "r") as f:
+        document = json.load(f)
+    events = document["traceEvents"]
+    
+    assert events[0]["ph"] == "M"
+    assert events[0]["args"]["name"] == "trace test-trace-123"
+    spans = {event["name"]: event for event in events[1:]}
+    assert set(spans) == {"parent_span", "test_llm_call"}
+    
+    call, parent = spans["test_llm_call"], spans["parent_span"]
+    assert call["ph"] == "X"
+    assert call["cat"] == "llm_call"
+    assert call["args"]["input"] == "What is Python?"
+    assert call["args"]["model"] == "gpt-4"
+    # The call is drawn inside its parent span
+    assert parent["ts"] <= call["ts"]
+    assert call["ts"] + call["dur"] <= parent["ts"] + parent["dur"] + 1